@@ -1,10 +1,12 @@
 #scraper.py
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import csv
 import os
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 import asyncio
 import aiohttp
 import logging
@@ -16,10 +18,22 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import sqlite3
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from python_anticaptcha import AnticaptchaClient, NoCaptchaTaskProxyless
 from celery import Celery
 from prometheus_client import start_http_server, Counter
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
 from config import (
     OUTPUT_DIR,
     HEADERS_LIST,
@@ -36,10 +50,30 @@ from config import (
     ANTICAPTCHA_KEY
 )
 
+# Кортежи быстрее для random.choice/итерации и защищены от изменений
+HEADERS_LIST = tuple(HEADERS_LIST)
+TARGET_URLS = tuple(TARGET_URLS)
+
+# Ограничение числа одновременных запросов и размер пакета записи в БД
+MAX_CONCURRENCY = 20
+WRITE_BATCH_SIZE = 500
+METRICS_FLUSH_INTERVAL = 1.0
+CSV_FIELDS = ['title', 'content', 'source', 'timestamp']
+
 # Prometheus metrics
 SCRAPED_PAGES = Counter('scraped_pages', 'Total scraped pages')
 SCRAPE_ERRORS = Counter('scrape_errors', 'Total scraping errors')
 
+# Настройки SQLite: WAL-журнал и отложенный fsync снижают задержку коммита.
+# WAL требует, чтобы файл БД находился на локальной файловой системе (не NFS/SMB).
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA busy_timeout=5000",
+)
+
 app = Celery('osint_tasks', broker='redis://localhost:6379/0')
 
 logger = logging.getLogger(__name__)
@@ -51,13 +85,72 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 log_handler.setFormatter(formatter)
 logger.addHandler(log_handler)
 
+def parse_article(article) -> Dict[str, str]:
+    """Извлекает данные из статьи.
+    Returns:
+        dict: Заголовок, контент и временная метка
+    """
+    title_el = article.find(TITLE_TAG)
+    title = title_el.get_text(strip=True) if title_el else "No Title"
+    if CONTENT_SELECTOR:
+        paragraphs = article.select(CONTENT_SELECTOR)
+        content = ' '.join(p.get_text(strip=True) for p in paragraphs)
+    else:
+        content = article.get_text(separator='\n', strip=True)
+    return {
+        'title': title,
+        'content': content,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def scrape_page(html: Union[str, bytes], source: str) -> List[Dict]:
+    """Парсит HTML страницу и извлекает статьи.
+    Функция модульного уровня, чтобы её можно было передать в ProcessPoolExecutor.
+    Args:
+        html (str | bytes): HTML содержимое; байты декодирует сам парсер
+        source (str): URL источника
+    Returns:
+        list: Список словарей статей
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    articles = []
+    for article in soup.find_all(ARTICLE_TAG):
+        try:
+            article_data = parse_article(article)
+            article_data['source'] = source
+            article_data['url'] = source
+            articles.append(article_data)
+        except Exception as e:
+            logger.error(f"Ошибка парсинга статьи: {e}")
+    return articles
+
 class OSINTScraper:
     def __init__(self):
         """Инициализация сессии, базы данных и выходного каталога."""
         self.session = requests.Session()
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=REQUEST_DELAY,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=100, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.max_concurrency = MAX_CONCURRENCY
+        self._driver = None
+        self._pending: List[tuple] = []
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        # Локальные счётчики асинхронного пути, периодически сбрасываются в Prometheus
+        self._local_scraped = 0
+        self._local_errors = 0
         self.output_dir = OUTPUT_DIR
         self.create_output_dir()
         self.db_conn = self.init_db()
+        self._seen_urls = {
+            row[0] for row in self.db_conn.execute('SELECT DISTINCT url FROM articles WHERE url IS NOT NULL')
+        }
 
     def create_output_dir(self):
         """Создаёт выходной каталог, если он не существует."""
@@ -68,6 +161,8 @@ class OSINTScraper:
     def init_db(self):
         """Инициализирует SQLite базу данных для хранения статей."""
         conn = sqlite3.connect('osint_articles.db')
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS articles (
@@ -79,88 +174,147 @@ class OSINTScraper:
                 source TEXT
             )
         ''')
+        # Одна статья на (url, title): повторный обход не плодит дубликаты
+        try:
+            cursor.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_url_title ON articles(url, title)'
+            )
+        except sqlite3.IntegrityError as e:
+            logger.warning(f"В БД уже есть дубликаты статей, уникальный индекс не создан: {e}")
+        # Полнотекстовый индекс без триггеров: пополняется пакетно в flush()
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts
+                USING fts5(title, content, source, content='articles', content_rowid='id')
+            ''')
+            self._fts_enabled = True
+            self._fts_last_id = cursor.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM articles_fts_docsize'
+            ).fetchone()[0]
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 недоступен, полнотекстовый индекс отключён: {e}")
+            self._fts_enabled = False
+            self._fts_last_id = 0
         conn.commit()
         return conn
 
     def get_random_headers(self):
-        """Выбирает случайный User-Agent из списка."""
-        return {'User-Agent': random.choice(HEADERS_LIST)}
+        """Выбирает случайный User-Agent и запрашивает сжатый ответ."""
+        return {'User-Agent': random.choice(HEADERS_LIST), 'Accept-Encoding': ACCEPT_ENCODING}
 
     def get_random_proxy(self):
         """Возвращает настройки прокси, если включено."""
         return PROXIES if USE_PROXY else None
 
-    async def fetch_async(self, url: str) -> Optional[str]:
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую aiohttp-сессию с пулом keep-alive соединений."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=10, enable_cleanup_closed=True),
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        return self._session
+
+    async def close_session(self):
+        """Закрывает общую aiohttp-сессию."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _flush_metrics(self):
+        """Переносит локальные счётчики в метрики Prometheus."""
+        if self._local_scraped:
+            SCRAPED_PAGES.inc(self._local_scraped)
+            self._local_scraped = 0
+        if self._local_errors:
+            SCRAPE_ERRORS.inc(self._local_errors)
+            self._local_errors = 0
+
+    async def _metrics_flusher(self):
+        """Фоновая задача: сбрасывает счётчики раз в METRICS_FLUSH_INTERVAL секунд."""
+        while True:
+            await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+            self._flush_metrics()
+
+    async def fetch_async(self, url: str) -> Optional[bytes]:
         """Асинхронно загружает страницу.
         Args:
             url (str): Ссылка для загрузки
         Returns:
-            str | None: HTML содержимое страницы
+            bytes | None: Необработанное HTML содержимое страницы (без декодирования)
         """
+        proxy_cfg = self.get_random_proxy()
+        proxy = proxy_cfg.get('http') if proxy_cfg else None
         try:
-            async with aiohttp.ClientSession(headers=self.get_random_headers()) as session:
-                async with session.get(url, proxy=self.get_random_proxy().get('http') if self.get_random_proxy() else None) as response:
-                    response.raise_for_status()
-                    SCRAPED_PAGES.inc()
-                    return await response.text()
+            session = await self._get_session()
+            async with session.get(url, headers=self.get_random_headers(), proxy=proxy) as response:
+                response.raise_for_status()
+                self._local_scraped += 1
+                logger.debug(f"{url}: Content-Encoding={response.headers.get('Content-Encoding')}")
+                return await response.read()
         except Exception as e:
-            SCRAPE_ERRORS.inc()
+            self._local_errors += 1
             logger.error(f"Ошибка при асинхронном запросе {url}: {e}")
             return None
 
-    def fetch_sync(self, url: str, retry: int = MAX_RETRIES) -> Optional[str]:
-        """Синхронно загружает страницу с повторными попытками."""
-        for attempt in range(retry):
-            try:
-                response = self.session.get(
-                    url,
-                    headers=self.get_random_headers(),
-                    proxies=self.get_random_proxy(),
-                    timeout=10
-                )
-                response.raise_for_status()
-                SCRAPED_PAGES.inc()
-                return response.text
-            except requests.RequestException as e:
-                SCRAPE_ERRORS.inc()
-                logger.warning(f"Попытка {attempt + 1} для {url} не удалась: {e}")
-                if attempt < retry - 1:
-                    import time
-                    time.sleep(REQUEST_DELAY * (attempt + 1))
-                continue
-        return None
+    def fetch_sync(self, url: str) -> Optional[bytes]:
+        """Синхронно загружает страницу; повторы выполняет HTTPAdapter сессии."""
+        try:
+            response = self.session.get(
+                url,
+                headers=self.get_random_headers(),
+                proxies=self.get_random_proxy(),
+                timeout=10
+            )
+            response.raise_for_status()
+            SCRAPED_PAGES.inc()
+            logger.debug(f"{url}: Content-Encoding={response.headers.get('Content-Encoding')}")
+            return response.content
+        except requests.RequestException as e:
+            SCRAPE_ERRORS.inc()
+            logger.warning(f"Не удалось загрузить {url}: {e}")
+            return None
+
+    def _claim_url(self, url: str) -> bool:
+        """Отмечает URL как обработанный; False, если он уже встречался."""
+        if url in self._seen_urls:
+            logger.info(f"Пропуск уже обработанного URL: {url}")
+            return False
+        self._seen_urls.add(url)
+        return True
+
+    async def scrape_async(self, url: str) -> List[Dict]:
+        """Асинхронно загружает и парсит страницу."""
+        if not self._claim_url(url):
+            return []
+        html = await self.fetch_async(url)
+        return await self.scrape_page_async(html, url) if html else []
+
+    def scrape_sync(self, url: str) -> List[Dict]:
+        """Синхронно загружает и парсит страницу."""
+        if not self._claim_url(url):
+            return []
+        html = self.fetch_sync(url)
+        return self.scrape_page(html, url) if html else []
 
     def parse_article(self, article) -> Dict[str, str]:
-        """Извлекает данные из статьи.
-        Returns:
-            dict: Заголовок, контент и временная метка
-        """
-        title = article.find(TITLE_TAG).get_text(strip=True) if article.find(TITLE_TAG) else "No Title"
-        content = ' '.join([p.get_text(strip=True) for p in article.select(CONTENT_SELECTOR)]) if CONTENT_SELECTOR else article.get_text(separator='\n', strip=True)
-        return {
-            'title': title,
-            'content': content,
-            'timestamp': datetime.now().isoformat()
-        }
+        """Извлекает данные из статьи."""
+        return parse_article(article)
 
-    def scrape_page(self, html: str, source: str) -> List[Dict]:
-        """Парсит HTML страницу и извлекает статьи.
-        Args:
-            html (str): HTML содержимое
-            source (str): URL источника
-        Returns:
-            list: Список словарей статей
-        """
-        soup = BeautifulSoup(html, 'html.parser')
-        articles = []
-        for article in soup.find_all(ARTICLE_TAG):
-            try:
-                article_data = self.parse_article(article)
-                article_data['source'] = source
-                articles.append(article_data)
-            except Exception as e:
-                logger.error(f"Ошибка парсинга статьи: {e}")
-        return articles
+    def scrape_page(self, html: Union[str, bytes], source: str) -> List[Dict]:
+        """Парсит HTML страницу и извлекает статьи."""
+        return scrape_page(html, source)
+
+    async def scrape_page_async(self, html: Union[str, bytes], source: str) -> List[Dict]:
+        """Парсит HTML в пуле процессов, не блокируя цикл событий."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_parse_pool(), scrape_page, html, source)
+
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        """Возвращает пул процессов для парсинга HTML, создавая его при первом вызове."""
+        if self._parse_pool is None:
+            self._parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        return self._parse_pool
 
     def handle_captcha(self, driver):
         """Решает CAPTCHA с использованием AntiCaptcha."""
@@ -177,15 +331,31 @@ class OSINTScraper:
         except Exception as e:
             logger.error(f"Ошибка при решении CAPTCHA: {e}")
 
+    def _get_driver(self):
+        """Возвращает переиспользуемый headless Chrome, создавая его при первом вызове."""
+        if self._driver is None:
+            options = Options()
+            options.add_argument('--headless')
+            options.add_argument('--disable-gpu')
+            options.add_argument('--no-sandbox')
+            self._driver = webdriver.Chrome(options=options)
+        return self._driver
+
+    def _quit_driver(self):
+        """Останавливает Chrome, если он был запущен."""
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                logger.warning(f"Ошибка при остановке Selenium: {e}")
+            self._driver = None
+
     def scrape_dynamic(self, url: str):
         """Скрапинг страниц с динамическим контентом через Selenium."""
-        options = Options()
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-
-        driver = webdriver.Chrome(options=options)
+        if not self._claim_url(url):
+            return []
         try:
+            driver = self._get_driver()
             driver.get(url)
             if 'g-recaptcha' in driver.page_source:
                 self.handle_captcha(driver)
@@ -196,67 +366,133 @@ class OSINTScraper:
             return self.scrape_page(html, url)
         except Exception as e:
             logger.error(f"Ошибка Selenium для {url}: {e}")
+            # Драйвер мог остаться в неконсистентном состоянии — пересоздадим его
+            self._quit_driver()
             return []
-        finally:
-            driver.quit()
 
     def save_article_to_db(self, article: Dict):
-        """Сохраняет статью в базу данных."""
+        """Ставит статью в очередь на запись в базу данных."""
+        self.save_articles_to_db([article])
+
+    def save_articles_to_db(self, articles: List[Dict]):
+        """Ставит пакет статей в очередь на запись; сброс в БД — по WRITE_BATCH_SIZE.
+        Args:
+            articles (list): Список словарей статей
+        """
+        self._pending.extend((a['url'], a['title'], a['content'], a['source']) for a in articles)
+        if len(self._pending) >= WRITE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные статьи в базу данных одной транзакцией."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute('''
-                INSERT INTO articles (url, title, content, source)
-                VALUES (?, ?, ?, ?)
-            ''', (article.get('url'), article['title'], article['content'], article['source']))
-            self.db_conn.commit()
+            with self.db_conn:
+                self.db_conn.executemany('''
+                    INSERT OR IGNORE INTO articles (url, title, content, source)
+                    VALUES (?, ?, ?, ?)
+                ''', pending)
+                if self._fts_enabled:
+                    self._index_new_articles()
         except Exception as e:
+            # Транзакция откатилась — возвращаем статьи в буфер для следующей попытки
+            self._pending[:0] = pending
             logger.error(f"Ошибка сохранения в БД: {e}")
 
+    def _index_new_articles(self):
+        """Добавляет в articles_fts статьи, записанные после последней индексации."""
+        self.db_conn.execute('''
+            INSERT INTO articles_fts (rowid, title, content, source)
+            SELECT id, title, content, source FROM articles WHERE id > ?
+        ''', (self._fts_last_id,))
+        self._fts_last_id = self.db_conn.execute(
+            'SELECT COALESCE(MAX(id), 0) FROM articles'
+        ).fetchone()[0]
+
     def save_to_csv(self, data: List[Dict], filename: str = 'osint_articles.csv'):
         """Сохраняет статьи в CSV файл."""
         try:
             filepath = os.path.join(self.output_dir, filename)
             with open(filepath, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=['title', 'content', 'source', 'timestamp'])
+                writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
                 writer.writeheader()
                 writer.writerows(data)
             logger.info(f"Данные сохранены в {filepath}")
         except Exception as e:
             logger.error(f"Ошибка при сохранении CSV: {e}")
 
+    def open_csv(self, filename: str = 'osint_articles.csv'):
+        """Открывает CSV файл для потоковой записи статей.
+        Returns:
+            tuple: Файловый объект и csv.DictWriter с записанным заголовком
+        """
+        filepath = os.path.join(self.output_dir, filename)
+        file = open(filepath, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        return file, writer
+
+    async def _bounded_scrape(self, url: str, semaphore: asyncio.Semaphore) -> List[Dict]:
+        """Парсит URL с ограничением числа одновременных запросов."""
+        async with semaphore:
+            return await self.scrape_async(url)
+
     async def run_async(self):
-        """Асинхронный запуск парсера."""
+        """Асинхронный запуск парсера: результаты пишутся по мере готовности."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        csv_file, csv_writer = self.open_csv()
+        metrics = asyncio.create_task(self._metrics_flusher())
+
         tasks = []
-        for url in TARGET_URLS:
-            if DYNAMIC_LOADING:
-                articles = self.scrape_dynamic(url)
-                for article in articles:
-                    self.save_article_to_db(article)
-            else:
-                tasks.append(self.scrape_async(url))
-
-        results = await asyncio.gather(*tasks)
-        all_articles = [article for sublist in results for article in sublist]
-        self.save_to_csv(all_articles)
+        try:
+            for url in TARGET_URLS:
+                if DYNAMIC_LOADING:
+                    articles = self.scrape_dynamic(url)
+                    self.save_articles_to_db(articles)
+                    csv_writer.writerows(articles)
+                else:
+                    tasks.append(self._bounded_scrape(url, semaphore))
+            for coro in asyncio.as_completed(tasks):
+                articles = await coro
+                self.save_articles_to_db(articles)
+                csv_writer.writerows(articles)
+        finally:
+            self.flush()
+            metrics.cancel()
+            self._flush_metrics()
+            await self.close_session()
+            csv_file.close()
+            logger.info(f"Данные сохранены в {csv_file.name}")
 
     def run_sync(self):
         """Синхронный запуск парсера."""
-        all_articles = []
-        for url in TARGET_URLS:
-            if DYNAMIC_LOADING:
-                articles = self.scrape_dynamic(url)
-            else:
-                articles = self.scrape_sync(url)
-
-            for article in articles:
-                self.save_article_to_db(article)
-            all_articles.extend(articles)
-
-        self.save_to_csv(all_articles)
+        csv_file, csv_writer = self.open_csv()
+        try:
+            for url in TARGET_URLS:
+                if DYNAMIC_LOADING:
+                    articles = self.scrape_dynamic(url)
+                else:
+                    articles = self.scrape_sync(url)
+
+                self.save_articles_to_db(articles)
+                csv_writer.writerows(articles)
+        finally:
+            self.flush()
+            csv_file.close()
+            logger.info(f"Данные сохранены в {csv_file.name}")
 
     def close(self):
         """Закрытие сессии и БД соединения."""
+        # Сначала дописываем буфер: статьи не должны теряться из-за ошибок при остановке драйвера
+        self.flush()
+        self._flush_metrics()
         self.session.close()
+        self._quit_driver()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
         self.db_conn.close()
         logger.info("Ресурсы освобождены")
 
@@ -266,8 +502,7 @@ def scrape_task(self, url):
     scraper = OSINTScraper()
     try:
         articles = scraper.scrape_sync(url)
-        for article in articles:
-            scraper.save_article_to_db(article)
+        scraper.save_articles_to_db(articles)
         return articles
     except Exception as e:
         self.retry(exc=e)
@@ -275,7 +510,6 @@ def scrape_task(self, url):
         scraper.close()
 
 if __name__ == "__main__":
-    import time
     start_http_server(8000)  # Запуск Prometheus метрик
     scraper = OSINTScraper()
     try:
@@ -12,6 +12,12 @@ def export_to_csv(articles: list, filepath: str):
 
 def export_to_db(articles: list, db_path: str = 'osint_articles.db'):
     conn = sqlite3.connect(db_path)
+    # WAL требует локальной файловой системы для файла БД
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA busy_timeout=5000")
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS articles (
@@ -22,11 +28,10 @@ def export_to_db(articles: list, db_path: str = 'osint_articles.db'):
             timestamp TEXT
         )
     ''')
-    for article in articles:
-        cursor.execute('''
+    with conn:
+        cursor.executemany('''
             INSERT INTO articles (title, content, source, timestamp)
             VALUES (?, ?, ?, ?)
-        ''', (article['title'], article['content'], article['source'], article['timestamp']))
-    conn.commit()
+        ''', ((a['title'], a['content'], a['source'], a['timestamp']) for a in articles))
     conn.close()
     logging.info(f"Экспортировано в БД: {db_path}")
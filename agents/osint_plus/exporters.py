@@ -22,11 +22,10 @@ def export_to_db(articles: list, db_path: str = 'osint_articles.db'):
             timestamp TEXT
         )
     ''')
-    for article in articles:
-        cursor.execute('''
+    with conn:
+        cursor.executemany('''
             INSERT INTO articles (title, content, source, timestamp)
             VALUES (?, ?, ?, ?)
-        ''', (article['title'], article['content'], article['source'], article['timestamp']))
-    conn.commit()
+        ''', ((a['title'], a['content'], a['source'], a['timestamp']) for a in articles))
     conn.close()
     logging.info(f"Экспортировано в БД: {db_path}")
@@ -1,23 +1,33 @@
 # agents/project_analyzer/analyzer.py
 
 import os
+import re
+import random
+import asyncio
 import sqlite3
+import threading
 import hashlib
 import zipfile
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from difflib import unified_diff
+from itertools import islice
 from datetime import datetime
-from typing import Optional, Dict, List, Set
+from typing import Optional, Dict, List, Sequence, Set
 
-import requests
 import httpx
 import logging
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 from .config import (
     ROOT_DIR,
     PREV_ZIP, CUR_ZIP, REPORTS_DIR,
-    FILE_EXTENSIONS, MAX_FILE_BYTES, MAX_CHUNK_CHARS,
+    FILE_EXTENSIONS_TUPLE, MAX_FILE_BYTES, MAX_CHUNK_CHARS, MAX_DIFF_LINES,
     AI_PROVIDER,
     # DeepSeek
     DEEPSEEK_API_URL, DEEPSEEK_API_KEY,
@@ -45,17 +55,82 @@ logger.addHandler(ch)
 
 # ============ Cache System ============
 
+# Параметры фоновой записи в кеш: максимальный пакет и окно ожидания (сек)
+CACHE_WRITE_BATCH = 64
+CACHE_WRITE_WINDOW = 0.05
+# Предел числа записей кеша; вытесняются давно не использованные (LRU по timestamp)
+MAX_CACHE_ROWS = 100_000
+CACHE_TRIM_PROBABILITY = 0.01
+
+_TIMESTAMP_RE = re.compile(r"\d{4}-?\d{2}-?\d{2}[T _]?\d{2}:?\d{2}(:?\d{2}(\.\d+)?)?")
+_LIST_ITEM_RE = re.compile(r"^\s*[+\-•]\s")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Заголовки секций build_project_summary / build_changes_report (в нижнем регистре);
+# списки файлов сортируются только под заголовками из _SORTED_SECTIONS
+_SORTED_SECTIONS = frozenset({"added files:", "removed files:", "main modules/directories:"})
+_REPORT_HEADERS = _SORTED_SECTIONS | {"modified files (first 50 diff lines):"}
+# Строки diff начинаются с ' ', '+', '-' или '@', поэтому голый ``` внутри блока — всегда его конец
+_DIFF_FENCE = "```diff"
+_FENCE = "```"
+
+def canonicalize_prompt(prompt: str) -> str:
+    """
+    Приводит prompt к «сигнатуре намерения» для семантического кеша:
+    убирает временные метки и путь к временному корню проекта, схлопывает пробелы,
+    понижает регистр заголовков секций отчёта и сортирует списки файлов под ними.
+    Тела diff (```diff ... ```) остаются побайтно: разные изменения кода
+    не должны давать одну сигнатуру.
+    """
+    lines: List[str] = []
+    run: List[str] = []
+    sorting = False
+    in_diff = False
+    for raw in prompt.splitlines():
+        if in_diff:
+            in_diff = raw != _FENCE
+            lines.append(raw)
+            continue
+        line = _WHITESPACE_RE.sub(" ", _TIMESTAMP_RE.sub("<ts>", raw)).strip()
+        if sorting and _LIST_ITEM_RE.match(raw):
+            run.append(line)
+            continue
+        if run:
+            lines.extend(sorted(run))
+            run = []
+        sorting = False
+        if line.startswith("Project root:"):
+            line = "Project root: <root>"
+        elif line.lower() in _REPORT_HEADERS:
+            line = line.lower()
+            sorting = line in _SORTED_SECTIONS
+        elif line == _DIFF_FENCE:
+            in_diff = True
+        lines.append(line)
+    lines.extend(sorted(run))
+    return "\n".join(lines).strip()
+
 class AICache:
     def __init__(self):
         self.db_path = os.path.join(ROOT_DIR, "cache_ai.db")
+        # Одно соединение на процесс; доступ из потоков сериализуется блокировкой
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Ключи, прочитанные из кеша; timestamp обновляется пакетно при записи
+        self._touched: Set[bytes] = set()
         self.conn = self._init_db()
         
     def _init_db(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=134217728")
+        self._migrate_hex_keys(conn)
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS ai_cache (
-                prompt_hash TEXT PRIMARY KEY,
+                prompt_hash BLOB PRIMARY KEY,
                 response TEXT,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                 provider TEXT
@@ -64,36 +139,178 @@ class AICache:
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_timestamp ON ai_cache(timestamp)
         """)
-        conn.commit()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(ai_cache)")}
+        if "signature" not in columns:
+            cursor.execute("ALTER TABLE ai_cache ADD COLUMN signature BLOB")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_signature ON ai_cache(signature)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_provider ON ai_cache(provider)
+        """)
         return conn
     
-    def get_response(self, prompt: str) -> Optional[str]:
-        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT response FROM ai_cache WHERE prompt_hash = ?",
-            (prompt_hash,)
+    @staticmethod
+    def _migrate_hex_keys(conn: sqlite3.Connection):
+        """Одноразово переводит старую схему (hex TEXT ключ) на 32-байтовый BLOB."""
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(ai_cache)")}
+        if columns.get("prompt_hash", "").upper() != "TEXT":
+            return
+        rows = conn.execute(
+            "SELECT prompt_hash, response, timestamp, provider FROM ai_cache"
+        ).fetchall()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DROP TABLE ai_cache")
+            conn.execute("""
+                CREATE TABLE ai_cache (
+                    prompt_hash BLOB PRIMARY KEY,
+                    response TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    provider TEXT
+                )
+            """)
+            conn.executemany(
+                "INSERT OR REPLACE INTO ai_cache VALUES (?, ?, ?, ?)",
+                (
+                    (sqlite3.Binary(bytes.fromhex(h)), response, ts, provider)
+                    for h, response, ts, provider in rows
+                )
+            )
+        logger.info(f"AI cache migrated to binary keys: {len(rows)} entries")
+
+    @staticmethod
+    def _hash_prompt(prompt: str) -> bytes:
+        return hashlib.sha256(prompt.encode('utf-8')).digest()
+
+    @staticmethod
+    def signature(prompt: str) -> bytes:
+        """SHA-256 от канонизированного prompt — вторичный ключ кеша."""
+        return hashlib.sha256(canonicalize_prompt(prompt).encode('utf-8')).digest()
+
+    def _row(self, prompt: str, response: str, provider: str) -> tuple:
+        return (
+            sqlite3.Binary(self._hash_prompt(prompt)),
+            response,
+            provider,
+            sqlite3.Binary(self.signature(prompt)),
         )
-        result = cursor.fetchone()
+
+    def get_response(self, prompt: str) -> Optional[str]:
+        prompt_hash = sqlite3.Binary(self._hash_prompt(prompt))
+        with self._lock:
+            result = self.conn.execute(
+                "SELECT response FROM ai_cache WHERE prompt_hash = ?",
+                (prompt_hash,)
+            ).fetchone()
+            if result:
+                self._touched.add(bytes(prompt_hash))
         return result[0] if result else None
     
+    def get_semantic(self, signature: bytes) -> Optional[str]:
+        """Ищет ответ по сигнатуре намерения (см. canonicalize_prompt)."""
+        with self._lock:
+            result = self.conn.execute(
+                "SELECT response, prompt_hash FROM ai_cache WHERE signature = ? LIMIT 1",
+                (sqlite3.Binary(signature),)
+            ).fetchone()
+            if result:
+                self._touched.add(bytes(result[1]))
+        return result[0] if result else None
+
     def set_response(self, prompt: str, response: str, provider: str):
-        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """INSERT OR REPLACE INTO ai_cache 
-               (prompt_hash, response, provider) VALUES (?, ?, ?)""",
-            (prompt_hash, response, provider)
-        )
-        self.conn.commit()
+        self._write_batch([self._row(prompt, response, provider)])
     
-    def cleanup_old_entries(self, days_old: int = 30):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "DELETE FROM ai_cache WHERE timestamp < datetime('now', ?) ",
-            (f" -{days_old} days",)
+    def _write_batch(self, batch: List[tuple]):
+        """Записывает пакет (prompt_hash, response, provider, signature) одной транзакцией."""
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                """INSERT OR REPLACE INTO ai_cache 
+                   (prompt_hash, response, provider, signature) VALUES (?, ?, ?, ?)""",
+                batch
+            )
+            self._flush_touched()
+            if random.random() < CACHE_TRIM_PROBABILITY:
+                self._trim()
+
+    def _flush_touched(self):
+        """Обновляет timestamp прочитанных записей (вызывать под self._lock)."""
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, set()
+        self.conn.executemany(
+            "UPDATE ai_cache SET timestamp = CURRENT_TIMESTAMP WHERE prompt_hash = ?",
+            ((sqlite3.Binary(h),) for h in touched)
+        )
+
+    def _trim(self, max_rows: int = MAX_CACHE_ROWS):
+        """Удаляет всё сверх max_rows самых свежих записей (вызывать под self._lock)."""
+        self.conn.execute(
+            """DELETE FROM ai_cache WHERE prompt_hash IN (
+                   SELECT prompt_hash FROM ai_cache ORDER BY timestamp DESC LIMIT -1 OFFSET ?
+               )""",
+            (max_rows,)
         )
-        self.conn.commit()
+
+    async def _drain(self):
+        """Фоновая задача: собирает записи в пакеты и сбрасывает их в БД."""
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + CACHE_WRITE_WINDOW
+            while len(batch) < CACHE_WRITE_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"AI cache write failed: {e}")
+
+    def start_writer(self):
+        """Запускает фоновую запись в текущем цикле событий."""
+        if self._writer is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._drain())
+
+    async def stop_writer(self):
+        """Дописывает очередь и останавливает фоновую запись."""
+        if self._writer is None:
+            return
+        self._queue.put_nowait(None)
+        await self._writer
+        self._writer = None
+        self._queue = None
+
+    async def store_response(self, prompt: str, response: str, provider: str):
+        """Сохраняет ответ через фоновую запись, а без неё — в отдельном потоке."""
+        if self._queue is not None:
+            self._queue.put_nowait(self._row(prompt, response, provider))
+        else:
+            await asyncio.to_thread(self.set_response, prompt, response, provider)
+
+    def cleanup_old_entries(self, days_old: int = 30):
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self._flush_touched()
+            self.conn.execute(
+                "DELETE FROM ai_cache WHERE timestamp < datetime('now', ?) ",
+                (f" -{days_old} days",)
+            )
+            self._trim()
 
 # Создаём одиночный экземпляр кеша
 cache = AICache()
@@ -108,22 +325,64 @@ def unzip_to_tmp(zip_path: str) -> str:
     tmp_dir = tempfile.mkdtemp(prefix=f"proj_{prefix}")
     try:
         with zipfile.ZipFile(zip_path, 'r') as z:
-            z.extractall(tmp_dir)
+            members = z.namelist()
+
+        # ZipFile не потокобезопасен на чтение — у каждого потока свой экземпляр.
+        # zlib отпускает GIL, поэтому распаковка членов архива идёт параллельно.
+        local = threading.local()
+        opened: List[zipfile.ZipFile] = []
+
+        def _extract(name: str):
+            zf = getattr(local, "zf", None)
+            if zf is None:
+                zf = local.zf = zipfile.ZipFile(zip_path, 'r')
+                opened.append(zf)
+            try:
+                zf.extract(name, tmp_dir)
+            except FileExistsError:
+                # гонка при создании общей родительской папки — повторяем
+                zf.extract(name, tmp_dir)
+
+        try:
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+                list(pool.map(_extract, members))
+        finally:
+            for zf in opened:
+                zf.close()
     except Exception as e:
         logger.error(f"Failed to unzip {zip_path}: {e}")
         raise
     return tmp_dir
 
-def gather_files(root: str, exts: Optional[List[str]] = None) -> Set[str]:
-    """Собирает все файлы с указанными расширениями."""
-    files = set()
-    for dirpath, _, filenames in os.walk(root):
-        for fname in filenames:
-            if exts is None or any(fname.endswith(ext) for ext in exts):
-                rel_path = os.path.relpath(os.path.join(dirpath, fname), root)
-                files.add(rel_path)
+def scan_files(root: str, exts: Optional[Sequence[str]] = None) -> Dict[str, int]:
+    """
+    Собирает файлы с указанными расширениями через os.scandir.
+    Возвращает {относительный путь: размер}; размер берётся из DirEntry,
+    без повторного stat на каждый файл.
+    """
+    if exts is not None and not isinstance(exts, tuple):
+        exts = tuple(exts)
+    files: Dict[str, int] = {}
+    stack = [(root, "")]
+    while stack:
+        dirpath, rel_dir = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    rel_path = rel_dir + entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, rel_path + os.sep))
+                    elif entry.is_file(follow_symlinks=False):
+                        if exts is None or entry.name.endswith(exts):
+                            files[rel_path] = entry.stat(follow_symlinks=False).st_size
+        except OSError as e:
+            logger.warning(f"Cannot scan {dirpath}: {e}")
     return files
 
+def gather_files(root: str, exts: Optional[Sequence[str]] = None) -> Set[str]:
+    """Собирает все файлы с указанными расширениями (только пути)."""
+    return set(scan_files(root, exts))
+
 def read_file_safely(path: str, max_bytes: int = MAX_FILE_BYTES) -> List[str]:
     """Читает файл с ограничением по размеру и обработкой ошибок."""
     try:
@@ -138,24 +397,46 @@ def read_file_safely(path: str, max_bytes: int = MAX_FILE_BYTES) -> List[str]:
         logger.warning(f"Error reading file {path}: {e}")
         return [f"# Error reading file: {str(e)}\n"]
 
+def _file_digest(path: str, chunk_size: int = 1 << 20) -> bytes:
+    """Хеш содержимого файла, читаемого блоками: xxh3 (C), если установлен, иначе BLAKE2b."""
+    h = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.digest()
+
 def diff_files(prev_dir: str, curr_dir: str) -> Dict[str, List]:
     """Сравнивает две версии проекта, возвращает dict с added/removed/modified."""
-    prev_files = gather_files(prev_dir, FILE_EXTENSIONS)
-    curr_files = gather_files(curr_dir, FILE_EXTENSIONS)
+    prev_files = scan_files(prev_dir, FILE_EXTENSIONS_TUPLE)
+    curr_files = scan_files(curr_dir, FILE_EXTENSIONS_TUPLE)
     
-    added   = sorted(curr_files - prev_files)
-    removed = sorted(prev_files - curr_files)
-    common  = prev_files & curr_files
+    added   = sorted(curr_files.keys() - prev_files.keys())
+    removed = sorted(prev_files.keys() - curr_files.keys())
+    common  = prev_files.keys() & curr_files.keys()
     
-    modified = []
-    for f in sorted(common):
+    def _diff_one(f: str) -> Optional[Dict[str, str]]:
+        # Одинаковый размер и хеш — файл не менялся, построчно не читаем
+        if prev_files[f] == curr_files[f]:
+            try:
+                if _file_digest(os.path.join(prev_dir, f)) == _file_digest(os.path.join(curr_dir, f)):
+                    return None
+            except OSError as e:
+                logger.warning(f"Cannot fingerprint {f}: {e}")
         prev_lines = read_file_safely(os.path.join(prev_dir, f))
         curr_lines = read_file_safely(os.path.join(curr_dir, f))
-        if prev_lines != curr_lines:
-            diff_snippet = "".join(list(unified_diff(
-                prev_lines, curr_lines, fromfile=f, tofile=f, lineterm=""
-            ))[:50])
-            modified.append({"file": f, "diff": diff_snippet})
+        if prev_lines == curr_lines:
+            return None
+        # SequenceMatcher квадратичен — для огромных (сгенерированных) файлов diff не строим
+        if len(prev_lines) > MAX_DIFF_LINES or len(curr_lines) > MAX_DIFF_LINES:
+            return {"file": f, "diff": f"<large file, {len(prev_lines)}→{len(curr_lines)} lines, diff skipped>"}
+        diff_snippet = "".join(islice(unified_diff(
+            prev_lines, curr_lines, fromfile=f, tofile=f, lineterm=""
+        ), 50))
+        return {"file": f, "diff": diff_snippet}
+
+    # Чтение и diff файлов независимы — раздаём их пулу потоков (порядок сохраняется)
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+        modified = [m for m in pool.map(_diff_one, sorted(common)) if m]
     
     return {
         "added": added,
@@ -163,21 +444,17 @@ def diff_files(prev_dir: str, curr_dir: str) -> Dict[str, List]:
         "modified": modified
     }
 
-def build_project_summary(root: str, files: Set[str]) -> str:
-    """Генерирует сводку структуры проекта."""
+def build_project_summary(root: str, files: Dict[str, int]) -> str:
+    """Генерирует сводку структуры проекта по {путь: размер} из scan_files."""
     total_files = len(files)
-    total_size = sum(
-        os.path.getsize(os.path.join(root, f))
-        for f in files
-        if os.path.exists(os.path.join(root, f))
-    )
+    total_size = sum(files.values())
     avg_size = total_size // total_files if total_files else 0
     
-    modules = {
-        os.sep.join(f.split(os.sep)[:2])
-        for f in files
-        if len(f.split(os.sep)) > 1
-    }
+    modules = set()
+    for f in files:
+        parts = f.split(os.sep, 2)
+        if len(parts) > 1:
+            modules.add(parts[0] + os.sep + parts[1])
     
     lines = [
         f"Project root: {root}",
@@ -222,6 +499,32 @@ def build_changes_report(changes: Dict) -> str:
     return "\n".join(parts)
 
 
+# ============ Shared HTTP client ============
+
+# Общие httpx-клиенты (keep-alive + пул соединений) на время одного цикла событий.
+# Ключ — флаг verify: OAuth GigaChat требует отключённой проверки сертификата.
+_HTTP_CLIENTS: Dict[bool, httpx.AsyncClient] = {}
+
+def _get_http_client(verify: bool = True) -> httpx.AsyncClient:
+    """Возвращает общий AsyncClient, создавая его при первом обращении."""
+    client = _HTTP_CLIENTS.get(verify)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=30,
+            verify=verify,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            http2=True
+        )
+        _HTTP_CLIENTS[verify] = client
+    return client
+
+async def close_http_clients():
+    """Закрывает общие HTTP-клиенты; вызывать при завершении цикла событий."""
+    while _HTTP_CLIENTS:
+        _, client = _HTTP_CLIENTS.popitem()
+        await client.aclose()
+
+
 # ============ AI Providers ============
 
 class AIProvider:
@@ -234,28 +537,27 @@ class AIProvider:
             return msg
         
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                resp = await client.post(
-                    DEEPSEEK_API_URL,
-                    json={
-                        "model": "deepseek-chat",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.7
-                    },
-                    headers={
-                        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                resp.raise_for_status()
-                return resp.json()["choices"][0]["message"]["content"]
+            resp = await _get_http_client().post(
+                DEEPSEEK_API_URL,
+                json={
+                    "model": "deepseek-chat",
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.7
+                },
+                headers={
+                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+                    "Content-Type": "application/json"
+                }
+            )
+            resp.raise_for_status()
+            return resp.json()["choices"][0]["message"]["content"]
         except Exception as e:
             msg = f"DeepSeek API error: {e}"
             logger.error(msg)
             return msg
 
     @staticmethod
-    def ask_gigachat(prompt: str) -> str:
+    async def ask_gigachat(prompt: str) -> str:
         """GigaChat API (с OAuth)."""
         if not GIGACHAT_API_KEY:
             msg = "GigaChat error: GIGACHAT_API_KEY not configured"
@@ -264,10 +566,9 @@ class AIProvider:
         
         try:
             # Получаем access_token
-            auth_resp = requests.post(
+            auth_resp = await _get_http_client(verify=False).post(
                 GIGACHAT_API_OAUTH_URL,
                 headers={"Authorization": f"Bearer {GIGACHAT_API_KEY}"},
-                verify=False,
                 timeout=10
             )
             auth_resp.raise_for_status()
@@ -278,7 +579,7 @@ class AIProvider:
                 return msg
             
             # Запрашиваем чат
-            api_resp = requests.post(
+            api_resp = await _get_http_client().post(
                 GIGACHAT_API_URL,
                 json={
                     "model": "GigaChat",
@@ -296,10 +597,10 @@ class AIProvider:
             return msg
 
     @staticmethod
-    def ask_ollama(prompt: str) -> str:
+    async def ask_ollama(prompt: str) -> str:
         """Ollama (локальный HTTP-сервис)."""
         try:
-            resp = requests.post(
+            resp = await _get_http_client().post(
                 OLLAMA_URL,
                 json={
                     "model": OLLAMA_MODEL,
@@ -316,7 +617,7 @@ class AIProvider:
             return msg
 
     @staticmethod
-    def ask_huggingface(prompt: str) -> str:
+    async def ask_huggingface(prompt: str) -> str:
         """HuggingFace Inference API."""
         if not HF_TOKEN:
             msg = "HuggingFace error: HF_TOKEN not configured"
@@ -324,7 +625,7 @@ class AIProvider:
             return msg
         
         try:
-            resp = requests.post(
+            resp = await _get_http_client().post(
                 HF_API_URL,
                 headers={"Authorization": f"Bearer {HF_TOKEN}"},
                 json={"inputs": prompt},
@@ -341,7 +642,7 @@ class AIProvider:
             return msg
 
     @staticmethod
-    def ask_openrouter(prompt: str) -> str:
+    async def ask_openrouter(prompt: str) -> str:
         """OpenRouter API (агрегатор)."""
         if not OPENROUTER_API_KEY:
             msg = "OpenRouter error: OPENROUTER_API_KEY not configured"
@@ -349,7 +650,7 @@ class AIProvider:
             return msg
         
         try:
-            resp = requests.post(
+            resp = await _get_http_client().post(
                 OPENROUTER_URL,
                 headers={
                     "Authorization": f"Bearer {OPENROUTER_API_KEY}",
@@ -377,8 +678,10 @@ async def get_ai_response(prompt: str) -> str:
     Получает ответ от AI: сначала проверяется кеш, 
     потом вызывается нужный провайдер, а результат сохраняется в кеш.
     """
-    # 1) Проверяем кеш
+    # 1) Проверяем кеш: точное совпадение, затем сигнатура намерения
     cached = cache.get_response(prompt)
+    if cached is None:
+        cached = cache.get_semantic(AICache.signature(prompt))
     if cached is not None:
         return cached
 
@@ -389,13 +692,13 @@ async def get_ai_response(prompt: str) -> str:
         if prov == "deepseek":
             result = await AIProvider.ask_deepseek(prompt)
         elif prov == "gigachat":
-            result = AIProvider.ask_gigachat(prompt)
+            result = await AIProvider.ask_gigachat(prompt)
         elif prov == "ollama":
-            result = AIProvider.ask_ollama(prompt)
+            result = await AIProvider.ask_ollama(prompt)
         elif prov in ("huggingface", "hf"):
-            result = AIProvider.ask_huggingface(prompt)
+            result = await AIProvider.ask_huggingface(prompt)
         elif prov == "openrouter":
-            result = AIProvider.ask_openrouter(prompt)
+            result = await AIProvider.ask_openrouter(prompt)
         else:
             result = f"Error: Unknown AI provider '{AI_PROVIDER}'"
             logger.error(result)
@@ -405,7 +708,7 @@ async def get_ai_response(prompt: str) -> str:
 
     # 3) Сохраняем результат в кеш, если это не сообщение об ошибке
     if result and not result.lower().startswith("error"):
-        cache.set_response(prompt, result, prov)
+        await cache.store_response(prompt, result, prov)
 
     return result
 
@@ -422,45 +725,55 @@ def save_analysis_report(
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_path = os.path.join(REPORTS_DIR, f"analysis_{timestamp}.md")
     
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(f"# Project Analysis Report ({timestamp})\n\n")
-        f.write("## Project Structure\n```\n")
-        f.write(structure)
-        f.write("\n```\n\n## Changes\n```\n")
-        f.write(changes)
-        f.write("\n```\n\n## Recommendations\n\n")
-        f.write(recommendations)
+    # Собираем отчёт целиком и пишем одним вызовом, с одной перекодировкой
+    payload = "".join([
+        f"# Project Analysis Report ({timestamp})\n\n",
+        "## Project Structure\n```\n", structure,
+        "\n```\n\n## Changes\n```\n", changes,
+        "\n```\n\n## Recommendations\n\n", recommendations,
+    ]).encode("utf-8")
+    with open(report_path, 'wb') as f:
+        f.write(payload)
     
     return report_path
 
 def update_reference_version():
-    """Обновляет previous_version.zip копированием current_version.zip."""
+    """
+    Делает current_version.zip эталоном: атомарно переименовывает его в prev_version.zip.
+    Без копирования содержимого (оба файла в ARCHIVE_DIR, одна ФС); следующий
+    анализ ждёт новый current_version.zip.
+    """
     if os.path.exists(CUR_ZIP):
         try:
-            shutil.copyfile(CUR_ZIP, PREV_ZIP)
+            os.replace(CUR_ZIP, PREV_ZIP)
         except Exception as e:
             logger.warning(f"Failed to update prev_version.zip: {e}")
 
 
 # ============ Main Analysis Flow ============
 
+def _archives_present() -> bool:
+    """Проверяет, что оба архива существуют. Если нет — выводит конкретную ошибку."""
+    for path in (PREV_ZIP, CUR_ZIP):
+        if not os.path.exists(path):
+            logger.error(f"Missing archive: {path}")
+            return False
+    return True
+
 async def analyze_project() -> Optional[str]:
     """Основной асинхронный поток анализа."""
-    # 1) Проверяем, что оба архива существуют. Если нет — выводим конкретную ошибку.
-    if not os.path.exists(PREV_ZIP):
-        logger.error(f"Missing archive: {PREV_ZIP}")
-        return None
-    if not os.path.exists(CUR_ZIP):
-        logger.error(f"Missing archive: {CUR_ZIP}")
+    # 1) Проверяем, что оба архива существуют
+    if not _archives_present():
         return None
     
     # 2) Распаковываем оба архива во временные директории
     prev_dir = unzip_to_tmp(PREV_ZIP)
     curr_dir = unzip_to_tmp(CUR_ZIP)
+    cache.start_writer()
     
     try:
         # 3) Структура текущей версии
-        curr_files = gather_files(curr_dir, FILE_EXTENSIONS)
+        curr_files = scan_files(curr_dir, FILE_EXTENSIONS_TUPLE)
         structure = build_project_summary(curr_dir, curr_files)
         
         # 4) Сравниваем с предыдущей версией
@@ -497,12 +810,16 @@ async def analyze_project() -> Optional[str]:
         # 9) Удаляем временные папки и чистим старые записи кеша
         shutil.rmtree(prev_dir, ignore_errors=True)
         shutil.rmtree(curr_dir, ignore_errors=True)
+        await cache.stop_writer()
         cache.cleanup_old_entries(days_old=30)
+        await close_http_clients()
 
 def analyze_and_report() -> Optional[str]:
     """
     Синхронная обёртка над async-функцией analyze_project(),
     чтобы можно было вызывать из runner.py как обычную функцию.
+    Если сравнивать нечего, цикл событий не создаётся вовсе.
     """
-    import asyncio
+    if not _archives_present():
+        return None
     return asyncio.run(analyze_project())
@@ -35,12 +35,15 @@ FILE_EXTENSIONS = os.getenv(
     "PA_FILE_EXTENSIONS", 
     ".py,.md,.yaml,.yml,.json,.txt"
 ).split(",")
+# Кортеж для str.endswith — одна проверка на C-уровне вместо цикла
+FILE_EXTENSIONS_TUPLE = tuple(e.strip() for e in FILE_EXTENSIONS if e.strip())
 
 # ------------------------------------------------------
 # 5) Ограничения на чтение файлов
 # ------------------------------------------------------
 MAX_FILE_BYTES  = int(os.getenv("PA_MAX_FILE_BYTES", 500_000))   # в байтах
 MAX_CHUNK_CHARS = int(os.getenv("PA_MAX_CHUNK_CHARS", 15_000))  # зарезервировано
+MAX_DIFF_LINES  = int(os.getenv("PA_MAX_DIFF_LINES", 20_000))   # больше — diff не строим
 
 # ------------------------------------------------------
 # 6) Настройки для OpenAI GPT (если всё-таки понадобится)
@@ -4,6 +4,7 @@
 #   email.py         — роуты для отправки писем (заглушка)
 #   files.py         — загрузка и обработка файлов (/files)
 #   process_router.py— обработка фоновых процессов (/process)
+#   responses.py     — класс ответа по умолчанию (ORJSONResponse, если есть orjson)
 #   search.py        — семантический поиск по контенту (/search)
 #   status.py        — получение статуса фоновых задач (/status/{task_id})
 #   stream.py        — потоковая загрузка данных (/stream)
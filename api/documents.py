@@ -9,6 +9,7 @@ from librarian_ai.core.parser import parse_text_file
 from librarian_ai.core.embedder import Embedder
 from librarian_ai.core.storage import save_to_db
 import os
+import asyncio
 
 router = APIRouter()
 embedder = Embedder()
@@ -19,19 +20,23 @@ async def upload_document(file: UploadFile = File(...)):
     os.makedirs("temp", exist_ok=True)
     
     with open(temp_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+        while chunk := await file.read(1024 * 1024):  # читаем по 1 МБ
+            f.write(chunk)
 
     parsed = parse_text_file(temp_path)
     if "text" not in parsed:
         return {"error": parsed.get("error", "Ошибка при парсинге")}
 
-    chunks = [parsed["text"][i:i+3000] for i in range(0, len(parsed["text"]), 3000)]
-    vectors = embedder.encode(chunks)
-    meta = [{"filename": parsed["meta"]["filename"], "chunk": i} for i in range(len(chunks))]
+    text = parsed["text"]
+    step = 3000
+    chunks = [text[i:i + step] for i in range(0, len(text), step)]
+    fname = parsed["meta"]["filename"]
+    meta = [{"filename": fname, "chunk": i} for i in range(len(chunks))]
 
-    embedder.save_index(vectors, meta)
-    save_to_db(parsed["text"], parsed["meta"])
+    # Векторизация и запись блокируют CPU/диск — выполняем вне цикла событий
+    vectors = await asyncio.to_thread(embedder.encode, chunks)
+    await asyncio.to_thread(embedder.save_index, vectors, meta)
+    await asyncio.to_thread(save_to_db, text, parsed["meta"])
 
     os.remove(temp_path)
     return {"status": "ok", "chunks": len(chunks), "filename": parsed["meta"]["filename"]}
@@ -5,8 +5,8 @@
 # 📄 Файл: api/files.py
 # 📌 Назначение: API эндпоинты для загрузки и обработки файлов
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, status, Depends
+from typing import List, Optional
 import os
 import logging
 import aiofiles
@@ -36,121 +36,121 @@ ALLOWED_MIME_TYPES = {
     'application/x-tar',
     'application/x-rar-compressed'
 }
+COMPATIBLE_EXTENSIONS = frozenset({'.pdf', '.docx', '.xlsx', '.txt', '.zip', '.tar', '.rar'})
 MAX_FILE_SIZE_MB = 50
+MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_CONCURRENCY = 4  # одновременно записываемых файлов пакета
+IN_MEMORY_MAX_SIZE = 1024 * 1024  # небольшие .txt обрабатываются без временного файла
 
 
-# ✅ Проверка MIME-типа и размера
-async def validate_file(file: UploadFile):
+def _too_large(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Превышен максимальный размер файла: {size // 1024} KB"
+    )
+
+
+# ✅ Проверка MIME-типа и размера (без seek/tell: размер из заголовков)
+async def validate_file(file: UploadFile, request: Optional[Request] = None):
     if file.content_type not in ALLOWED_MIME_TYPES:
         raise HTTPException(status_code=400, detail=f"Недопустимый MIME-тип: {file.content_type}")
 
-    await file.seek(0, os.SEEK_END)
-    size = file.tell()
-    if size > MAX_FILE_SIZE_MB * 1024 * 1024:
-        raise HTTPException(status_code=400, detail=f"Превышен максимальный размер файла: {size // 1024} KB")
-    await file.seek(0)
+    # Быстрый путь: размер части multipart или Content-Length запроса
+    if file.size is not None:
+        size = file.size
+    elif request is not None:
+        size = int(request.headers.get("content-length", 0))
+    else:
+        size = 0
+    if size > MAX_FILE_SIZE:
+        raise _too_large(size)
 
 
-# ✅ Одиночная загрузка и обработка
-@router.post("/upload/", status_code=status.HTTP_200_OK)
-async def upload_file(file: UploadFile = File(...)):
-    await validate_file(file)
+# ✅ Потоковая запись во временный файл с контролем размера
+async def _save_upload(file: UploadFile) -> str:
     suffix = os.path.splitext(file.filename)[1]
-
     with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        async with aiofiles.open(tmp.name, 'wb') as out:
-            content = await file.read()
-            await out.write(content)
         tmp_path = tmp.name
+    written = 0
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > MAX_FILE_SIZE:
+                    raise _too_large(written)
+                await out.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+# ✅ Общий путь загрузки: проверка → (память | потоковая запись) → разбор → очистка
+async def _ingest(file: UploadFile, request: Optional[Request] = None) -> dict:
+    await validate_file(file, request)
+    if file.content_type == 'text/plain' and file.size is not None and file.size <= IN_MEMORY_MAX_SIZE:
+        # Маленький текст: SpooledTemporaryFile ещё в памяти — без записи и повторного чтения с диска
+        result = await loader.load_bytes(await file.read(), file.filename, file.content_type)
+    else:
+        tmp_path = await _save_upload(file)
+        try:
+            result = await loader.load_file(tmp_path)
+        finally:
+            os.unlink(tmp_path)
+    return {
+        "filename": file.filename,
+        "chunk_count": len(result.chunks),
+        "language": result.metadata.language,
+        "size_kb": result.metadata.size // 1024,
+        "mime_type": result.metadata.mime_type,
+        "processing_time": round(result.processing_time, 2),
+    }
+
 
+# ✅ Одиночная загрузка и обработка
+@router.post("/upload/", status_code=status.HTTP_200_OK)
+async def upload_file(request: Request, file: UploadFile = File(...)):
     try:
-        result = await loader.load_file(tmp_path)
-        return {
-            "filename": file.filename,
-            "chunk_count": len(result.chunks),
-            "language": result.metadata.language,
-            "size_kb": result.metadata.size // 1024,
-            "mime_type": result.metadata.mime_type,
-            "processing_time": round(result.processing_time, 2),
-        }
+        return await _ingest(file, request)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при обработке файла {file.filename}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка обработки файла")
-    finally:
-        os.unlink(tmp_path)
 
 
 # ✅ Пакетная загрузка
 @router.post("/upload/batch/", status_code=status.HTTP_200_OK)
 async def upload_batch(files: List[UploadFile] = File(...)):
-    async def process_one(file: UploadFile):
-        await validate_file(file)
-        suffix = os.path.splitext(file.filename)[1]
-
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            async with aiofiles.open(tmp.name, 'wb') as out:
-                content = await file.read()
-                await out.write(content)
-            tmp_path = tmp.name
-
-        try:
-            result = await loader.load_file(tmp_path)
-            return {
-                "filename": file.filename,
-                "chunk_count": len(result.chunks),
-                "language": result.metadata.language,
-                "size_kb": result.metadata.size // 1024,
-                "mime_type": result.metadata.mime_type,
-                "processing_time": round(result.processing_time, 2),
-            }
-        except Exception as e:
-            logger.error(f"Ошибка обработки файла {file.filename}: {str(e)}", exc_info=True)
-            return {
-                "filename": file.filename,
-                "error": str(e)
-            }
-        finally:
-            os.unlink(tmp_path)
-
-    results = await asyncio.gather(*(process_one(file) for file in files))
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def bounded(file: UploadFile) -> dict:
+        async with semaphore:
+            return await _ingest(file)
+
+    outcomes = await asyncio.gather(*(bounded(file) for file in files), return_exceptions=True)
+    results = []
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, BaseException):
+            error = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+            logger.error(f"Ошибка обработки файла {file.filename}: {error}")
+            results.append({"filename": file.filename, "error": error})
+        else:
+            results.append(outcome)
     return {
         "files_processed": len(results),
         "details": results
     }
 
 
-# ✅ Потоковая загрузка больших файлов
-@router.post("/upload/stream/", status_code=status.HTTP_200_OK)
-async def upload_stream_file(file: UploadFile = File(...)):
-    await validate_file(file)
-    suffix = os.path.splitext(file.filename)[1]
-
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        async with aiofiles.open(tmp.name, 'wb') as out:
-            while chunk := await file.read(1024 * 1024):  # читаем по 1 МБ
-                await out.write(chunk)
-        tmp_path = tmp.name
-
-    try:
-        result = await loader.load_file(tmp_path)
-        return {
-            "filename": file.filename,
-            "chunk_count": len(result.chunks),
-            "language": result.metadata.language,
-            "size_kb": result.metadata.size // 1024,
-            "mime_type": result.metadata.mime_type,
-            "processing_time": round(result.processing_time, 2),
-        }
-    except Exception as e:
-        logger.error(f"Ошибка при потоковой загрузке {file.filename}: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Ошибка обработки потока")
-    finally:
-        os.unlink(tmp_path)
+# ✅ Потоковая загрузка больших файлов — тот же потоковый обработчик, что и /upload/
+upload_stream_file = router.post("/upload/stream/", status_code=status.HTTP_200_OK)(upload_file)
 
 
 # ✅ Проверка совместимости файла
 @router.get("/check/{filename}", status_code=status.HTTP_200_OK)
 async def check_file_compatibility(filename: str):
     _, ext = os.path.splitext(filename.lower())
-    compatible = ext in ['.pdf', '.docx', '.xlsx', '.txt', '.zip', '.tar', '.rar']
+    compatible = ext in COMPATIBLE_EXTENSIONS
     return JSONResponse({"compatible": compatible})
\ No newline at end of file
@@ -1,15 +1,26 @@
 # 📄 Файл: api/metrics.py
+import os
+
 from fastapi import APIRouter, Response
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY
+from prometheus_client import multiprocess
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["Monitoring"]
 )
 
+# При нескольких воркерах Uvicorn каждый пишет метрики в PROMETHEUS_MULTIPROC_DIR
+# (переменная должна быть задана до старта процессов), а scrape агрегирует их все
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    _registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(_registry)
+else:
+    _registry = REGISTRY
+
 @router.get("/metrics", summary="Prometheus metrics endpoint")
 def metrics():
     """
     Возвращает метрики в формате Prometheus (для Grafana/Prometheus scrape).
     """
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(content=generate_latest(_registry), media_type=CONTENT_TYPE_LATEST)
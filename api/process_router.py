@@ -1,11 +1,12 @@
 # 📄 api/process_router.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status, Query, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status, Query, BackgroundTasks, Request
 from fastapi.responses import JSONResponse
 from fastapi.concurrency import run_in_threadpool
+from api.responses import DefaultResponse
 from core.document_processor import DocumentProcessor
 from core.loader import split_into_chunks
-from core.tools.async_tasks import process_document_async, create_status_task
+from core.tools.async_tasks import process_document_async
 from models.schemas import (
     ProcessingResponse,
     EntityResponse,
@@ -16,29 +17,112 @@ from models.schemas import (
 from typing import List, Optional
 from uuid import uuid4
 import aiofiles
+import io
 import os
+import shutil
 import logging
-from datetime import datetime
+import time
+from functools import lru_cache
+from contextlib import asynccontextmanager, suppress
+from concurrent.futures import ProcessPoolExecutor
 from config import settings
 from utils.file_utils import clean_temp_files
 
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
 logger = logging.getLogger(__name__)
 
+PDF_WORKERS = os.cpu_count() or 1
+PDF_PARALLEL_MIN_PAGES = 8  # меньше — накладные расходы пула дороже выигрыша
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB на один write(): меньше системных вызовов на загрузку
+
+@lru_cache()
+def get_processor() -> DocumentProcessor:
+    """Один процессор на воркер: создаётся при старте приложения, а не при импорте модуля"""
+    return DocumentProcessor(
+        max_retries=settings.PROCESSOR_MAX_RETRIES,
+        health_check_interval=settings.HEALTH_CHECK_INTERVAL,
+        cache_ttl=settings.CACHE_TTL
+    )
+
+@asynccontextmanager
+async def lifespan(app):
+    global _pdf_pool
+    processor = await run_in_threadpool(get_processor)
+    warmup = getattr(processor, "warmup", None)
+    if warmup is not None:
+        await warmup()
+    try:
+        yield
+    finally:
+        aclose = getattr(processor, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        get_processor.cache_clear()
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown()
+            _pdf_pool = None
+
 router = APIRouter(
+    default_response_class=DefaultResponse,
     prefix="/api/v1/documents",
     tags=["Document Processing"],
+    lifespan=lifespan,
     responses={
         404: {"model": ErrorResponse, "description": "Resource not found"},
         429: {"model": ErrorResponse, "description": "Rate limit exceeded"}
     }
 )
 
-# Инициализация процессора
-processor = DocumentProcessor(
-    max_retries=settings.PROCESSOR_MAX_RETRIES,
-    health_check_interval=settings.HEALTH_CHECK_INTERVAL,
-    cache_ttl=settings.CACHE_TTL
-)
+def _source_fd(src) -> Optional[int]:
+    """Дескриптор загрузки, если она уже лежит на диске (SpooledTemporaryFile после rollover)"""
+    raw = getattr(src, '_file', src)
+    try:
+        return raw.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+def _file_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="File too large")
+
+def _persist(src, path: str, max_size: Optional[int] = None) -> None:
+    fd = _source_fd(src) if hasattr(os, 'sendfile') else None
+    with open(path, 'wb') as out_file:
+        if fd is not None:
+            # Копирование внутри ядра без промежуточных bytes в Python
+            size = os.fstat(fd).st_size
+            if max_size is not None and size > max_size:
+                raise _file_too_large()
+            offset = 0
+            try:
+                while offset < size:
+                    sent = os.sendfile(out_file.fileno(), fd, offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+                return
+            except OSError:
+                if offset:
+                    raise
+        if max_size is None:
+            shutil.copyfileobj(src, out_file, UPLOAD_CHUNK_SIZE)
+            return
+        written = 0
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > max_size:
+                raise _file_too_large()
+            out_file.write(chunk)
+
+async def stream_to_disk(file: UploadFile, path: str, max_size: Optional[int] = None) -> None:
+    """Пишет загрузку на диск порциями за один переход в пул потоков"""
+    await file.seek(0)
+    await run_in_threadpool(_persist, file.file, path, max_size)
 
 @router.post(
     "/process",
@@ -47,49 +131,62 @@ processor = DocumentProcessor(
     summary="Process document synchronously"
 )
 async def process_document(
+    http_request: Request,
     file: UploadFile = File(...),
     min_confidence: float = Query(0.7, ge=0.0, le=1.0),
     chunk_size: int = Query(1000, ge=100, le=5000),
     filters: Optional[List[str]] = Query(None),
-    background_tasks: BackgroundTasks = Depends()
+    processor: DocumentProcessor = Depends(get_processor)
 ):
     try:
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
+        # Размер из multipart/Content-Length без seek/tell по SpooledTemporaryFile;
+        # точная проверка — счётчиком при записи на диск
+        if file.size is not None:
+            file_size = file.size
+        else:
+            file_size = int(http_request.headers.get('content-length', 0))
         if file_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File too large")
-        file.file.seek(0)
+            raise _file_too_large()
 
-        start_time = datetime.utcnow()
+        start = time.perf_counter_ns()
         file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in settings.ALLOWED_EXTENSIONS:
+        if file_ext not in settings.ALLOWED_EXTENSIONS_SET:
             raise HTTPException(status_code=415, detail="Unsupported file type")
 
         temp_path = os.path.join(settings.TEMP_DIR, f"{uuid4()}{file_ext}")
-        background_tasks.add_task(clean_temp_files, temp_path)
+        try:
+            await stream_to_disk(file, temp_path, settings.MAX_FILE_SIZE)
 
-        async with aiofiles.open(temp_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+            text = await extract_text(temp_path, file_ext)
+            chunks = split_into_chunks(text, chunk_size=chunk_size)
+            session_id = str(uuid4())
 
-        text = await extract_text(temp_path, file_ext)
-        chunks = split_into_chunks(text, chunk_size=chunk_size)
-        session_id = str(uuid4())
+            # Повторяющиеся чанки процессор векторизует один раз; эмбеддинги выровнены
+            # по исходным чанкам, None — чанк не удалось векторизовать
+            embeddings, entities = await processor.process_document(
+                chunks,
+                source_path=file.filename,
+                session_id=session_id,
+                extract_params={"min_confidence": min_confidence, "filters": filters}
+            )
+        finally:
+            # Файл нужен только до конца обработки — удаляем сразу, а не после отправки ответа
+            with suppress(FileNotFoundError):
+                os.unlink(temp_path)
 
-        embeddings, entities = await processor.process_document(
-            chunks,
-            source_path=file.filename,
-            session_id=session_id,
-            extract_params={"min_confidence": min_confidence, "filters": filters}
-        )
+        failed = sum(1 for emb in embeddings if emb is None)
+        warnings = []
+        if failed:
+            logger.warning(f"Embedding failed for {failed} of {len(chunks)} chunks in {file.filename}")
+            warnings.append(f"{failed} of {len(chunks)} chunks could not be embedded")
 
-        return ProcessingResponse(
+        return ProcessingResponse.model_construct(
             session_id=session_id,
-            processing_time=(datetime.utcnow() - start_time).total_seconds(),
-            chunks_processed=len(embeddings),
+            processing_time=(time.perf_counter_ns() - start) / 1e9,
+            chunks_processed=len(chunks) - failed,
             entities_found=len(entities),
-            entities=[EntityResponse(**e.to_dict()) for e in entities],
-            warnings=[]
+            entities=[EntityResponse.model_validate(e.to_dict()) for e in entities],
+            warnings=warnings
         )
 
     except HTTPException:
@@ -116,9 +213,7 @@ async def async_process_document(
         temp_path = os.path.join(settings.TEMP_DIR, f"{uuid4()}{file_ext}")
         background_tasks.add_task(clean_temp_files, temp_path)
 
-        async with aiofiles.open(temp_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+        await stream_to_disk(file, temp_path)
 
         task = process_document_async.delay(temp_path)
 
@@ -135,7 +230,7 @@ async def async_process_document(
     response_model=HealthStatusResponse,
     summary="Service health status"
 )
-async def health_check():
+async def health_check(processor: DocumentProcessor = Depends(get_processor)):
     try:
         status = await processor.check_health()
         if not all([status.vector_store, status.embedder, status.extractor]):
@@ -165,10 +260,49 @@ async def extract_text(file_path: str, file_ext: str) -> str:
         logger.error(f"Text extraction failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to extract text from {file_ext} file")
 
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pdf_pool
+
+def _extract_pdf_pages(file_path: str, pages: range) -> str:
+    from pdfminer.high_level import extract_text
+    return extract_text(file_path, page_numbers=pages)
+
+def _extract_pdf_text_pdfium(file_path: str) -> str:
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        parts = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            parts.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return "\n".join(parts)
+    finally:
+        pdf.close()
+
 def extract_pdf_text(file_path: str) -> str:
+    if pdfium is not None:
+        try:
+            return _extract_pdf_text_pdfium(file_path)
+        except Exception as e:
+            logger.warning(f"pypdfium2 extraction failed, falling back to pdfminer: {str(e)}")
     try:
         from pdfminer.high_level import extract_text
-        return extract_text(file_path)
+        from pdfminer.pdfpage import PDFPage
+
+        with open(file_path, 'rb') as f:
+            page_count = sum(1 for _ in PDFPage.get_pages(f))
+        if page_count < PDF_PARALLEL_MIN_PAGES:
+            return extract_text(file_path)
+
+        # pdfminer упирается в GIL — делим страницы на диапазоны по процессам
+        step = -(-page_count // PDF_WORKERS)
+        ranges = [range(i, min(i + step, page_count)) for i in range(0, page_count, step)]
+        parts = _get_pdf_pool().map(_extract_pdf_pages, [file_path] * len(ranges), ranges)
+        return "".join(parts)
     except Exception as e:
         logger.error(f"PDF extraction failed: {str(e)}")
         raise
@@ -0,0 +1,11 @@
+# 📄 api/responses.py
+# 📌 Класс ответа по умолчанию для роутеров с крупными JSON-ответами
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    # orjson не установлен — стандартный json
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+__all__ = ["DefaultResponse"]
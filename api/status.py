@@ -2,9 +2,15 @@
 
 from fastapi import APIRouter, status
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from celery.result import AsyncResult
 from pydantic import BaseModel
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import functools
 import logging
+import time
+import weakref
 
 from core.tools.async_tasks import celery_app as celery
 
@@ -12,52 +18,96 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+STATUS_CACHE_TTL = 2.0  # секунды для незавершённых задач
+STATUS_CACHE_MAX_SIZE = 10_000
+TERMINAL_STATES = frozenset({'SUCCESS', 'FAILURE', 'REVOKED'})
+
+# Один handle Celery на модуль, без разбора kwargs на каждом опросе
+_get_result = functools.partial(AsyncResult, app=celery)
+
+_status_cache: Dict[str, Tuple[float, "TaskStatusResponse"]] = {}
+_status_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
 class TaskStatusResponse(BaseModel):
     task_id: str
     status: str
-    progress: float = None
-    result: object = None
-    error: str = None
+    progress: Optional[float] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+def _build_status(task_id: str) -> TaskStatusResponse:
+    task = _get_result(task_id)
+
+    if task.state == 'PENDING':
+        return TaskStatusResponse.model_construct(
+            task_id=task_id,
+            status=task.state
+        )
+
+    elif task.state in ['STARTED', 'PROGRESS']:
+        info = task.info or {}
+        return TaskStatusResponse.model_construct(
+            task_id=task_id,
+            status=task.state,
+            progress=float(info.get('progress', 0)),
+            result=None
+        )
+
+    elif task.successful():
+        return TaskStatusResponse.model_construct(
+            task_id=task_id,
+            status=task.state,
+            result=task.result
+        )
+
+    elif task.failed():
+        return TaskStatusResponse.model_construct(
+            task_id=task_id,
+            status=task.state,
+            error=str(task.result)
+        )
+
+    else:
+        return TaskStatusResponse.model_construct(
+            task_id=task_id,
+            status=task.state
+        )
+
+def _cached_status(task_id: str) -> Optional[TaskStatusResponse]:
+    entry = _status_cache.get(task_id)
+    if entry is None:
+        return None
+    expires_at, response = entry
+    if expires_at < time.monotonic():
+        del _status_cache[task_id]
+        return None
+    return response
+
+def _remember_status(task_id: str, response: TaskStatusResponse) -> None:
+    if len(_status_cache) >= STATUS_CACHE_MAX_SIZE:
+        _status_cache.pop(next(iter(_status_cache)))
+    # Итоговый статус уже не изменится — держим до вытеснения
+    ttl = float("inf") if response.status in TERMINAL_STATES else STATUS_CACHE_TTL
+    _status_cache[task_id] = (time.monotonic() + ttl, response)
 
 @router.get("/status/{task_id}", response_model=TaskStatusResponse)
 async def get_task_status(task_id: str):
     try:
-        task = AsyncResult(task_id, app=celery)
-
-        if task.state == 'PENDING':
-            return TaskStatusResponse(
-                task_id=task_id,
-                status=task.state
-            )
-
-        elif task.state in ['STARTED', 'PROGRESS']:
-            info = task.info or {}
-            return TaskStatusResponse(
-                task_id=task_id,
-                status=task.state,
-                progress=float(info.get('progress', 0)),
-                result=None
-            )
-
-        elif task.successful():
-            return TaskStatusResponse(
-                task_id=task_id,
-                status=task.state,
-                result=task.result
-            )
-
-        elif task.failed():
-            return TaskStatusResponse(
-                task_id=task_id,
-                status=task.state,
-                error=str(task.result)
-            )
-
-        else:
-            return TaskStatusResponse(
-                task_id=task_id,
-                status=task.state
-            )
+        cached = _cached_status(task_id)
+        if cached is not None:
+            return cached
+
+        # Параллельные опросы одной задачи ждут один запрос к backend
+        lock = _status_locks.get(task_id)
+        if lock is None:
+            lock = _status_locks[task_id] = asyncio.Lock()
+        async with lock:
+            cached = _cached_status(task_id)
+            if cached is not None:
+                return cached
+            response = await run_in_threadpool(_build_status, task_id)
+            _remember_status(task_id, response)
+            return response
 
     except Exception as e:
         logger.error(f"Error getting task status: {str(e)}")
@@ -65,4 +115,3 @@ async def get_task_status(task_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"detail": f"Internal Server Error: {str(e)}"}
         )
-
@@ -1,10 +1,14 @@
 # 📂 api/summary.py
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 from typing import Optional, Literal
 from core.summary_generator import UniversalSummaryGenerator, SummaryConfig
+from core.tools.summary_cache import SummaryCache
+from fastapi.concurrency import run_in_threadpool
+from api.responses import DefaultResponse
+import json
 import logging
-from datetime import datetime
+import time
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -14,25 +18,41 @@ logging.basicConfig(
 )
 
 router = APIRouter(
+    default_response_class=DefaultResponse,
     prefix="/api/v1",
     tags=["summary"],
     responses={404: {"description": "Not found"}}
 )
 
 generator = UniversalSummaryGenerator()
+summary_cache = SummaryCache()
+
+# Статичные примеры сериализуются один раз при импорте
+_EXAMPLES_JSON = json.dumps({
+    "legal": {
+        "text": "Статья 128 УК РФ предусматривает...",
+        "language": "ru",
+        "length": "medium"
+    },
+    "tech": {
+        "text": "Python 3.12 introduces new typing features...",
+        "custom_role": "Software Engineer",
+        "style": "academic"
+    }
+}, ensure_ascii=False).encode("utf-8")
 
 # Модели запросов/ответов
 class SummaryRequest(BaseModel):
-    text: str = Field(..., min_length=50, max_length=100000, example="Полный текст для анализа...")
-    language: str = Field("ru", regex="^[a-z]{2}$", example="ru")
+    text: str = Field(..., min_length=50, max_length=100000, json_schema_extra={"example": "Полный текст для анализа..."})
+    language: str = Field("ru", pattern="^[a-z]{2}$", json_schema_extra={"example": "ru"})
     custom_role: Optional[str] = Field(
         None, 
         min_length=3, 
-        example="Game Designer",
+        json_schema_extra={"example": "Game Designer"},
         description="Кастомная роль для генерации (если не указана - будет автоопределение)"
     )
-    length: Literal['short', 'medium', 'long'] = Field("medium", example="medium")
-    style: Literal['academic', 'professional', 'casual'] = Field("professional", example="professional")
+    length: Literal['short', 'medium', 'long'] = Field("medium", json_schema_extra={"example": "medium"})
+    style: Literal['academic', 'professional', 'casual'] = Field("professional", json_schema_extra={"example": "professional"})
 
 class SummaryResponse(BaseModel):
     content_type: str
@@ -59,12 +79,23 @@ async def generate_summary(
     - Ручного указания профессии
     - Настройки длины и стиля
     """
-    start_time = datetime.now()
+    start = time.perf_counter_ns()
     client_ip = http_request.client.host
     
     try:
         logger.info(f"Request from {client_ip} | Language: {request.language} | Chars: {len(request.text)}")
         
+        # Семантический кэш: похожий текст в том же режиме уже суммаризировался
+        use_cache = http_request.headers.get("x-skip-cache", "").lower() not in ("1", "true", "yes")
+        namespace = (request.language, request.length, request.style, request.custom_role)
+        vector = await run_in_threadpool(summary_cache.embed, request.text) if use_cache else None
+        if vector is not None:
+            cached = summary_cache.lookup(namespace, vector)
+            if cached is not None:
+                elapsed_ms = (time.perf_counter_ns() - start) // 1_000_000
+                logger.info(f"Cache hit | Time: {elapsed_ms}ms")
+                return SummaryResponse.model_construct(**cached, processing_time_ms=elapsed_ms)
+
         config = SummaryConfig(
             length=request.length,
             style=request.style
@@ -78,13 +109,14 @@ async def generate_summary(
         )
         
         # Добавляем метрики производительности
-        processing_time = (datetime.now() - start_time).total_seconds() * 1000
-        response = {
-            **result,
-            "processing_time_ms": int(processing_time)
-        }
+        elapsed_ms = (time.perf_counter_ns() - start) // 1_000_000
+        # Результат генератора — доверенные внутренние данные, повторная валидация не нужна
+        response = SummaryResponse.model_construct(**result, processing_time_ms=elapsed_ms)
         
-        logger.info(f"Success | Roles: {len(result['summaries'])} | Time: {processing_time:.0f}ms")
+        if vector is not None:
+            summary_cache.store(namespace, vector, result)
+
+        logger.info(f"Success | Roles: {len(result['summaries'])} | Time: {elapsed_ms}ms")
         
         return response
         
@@ -101,15 +133,4 @@ async def generate_summary(
 # Примеры для Swagger
 @router.get("/examples", include_in_schema=False)
 async def get_examples():
-    return {
-        "legal": {
-            "text": "Статья 128 УК РФ предусматривает...",
-            "language": "ru",
-            "length": "medium"
-        },
-        "tech": {
-            "text": "Python 3.12 introduces new typing features...",
-            "custom_role": "Software Engineer",
-            "style": "academic"
-        }
-    }
\ No newline at end of file
+    return Response(content=_EXAMPLES_JSON, media_type="application/json")
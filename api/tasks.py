@@ -1,10 +1,12 @@
 # 📄 api/tasks.py
 
 from fastapi import APIRouter, HTTPException
+from api.responses import DefaultResponse
 from core.tools.async_tasks import get_task_status, cancel_task
 from core.models.schemas import AsyncTaskStatusResponse, ErrorResponse
 
 router = APIRouter(
+    default_response_class=DefaultResponse,
     prefix="/api/v1/tasks",
     tags=["Task Management"],
     responses={
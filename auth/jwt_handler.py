@@ -1,18 +1,46 @@
 # auth/jwt_handler.py
-import jwt
-from typing import Optional
+from jose import JWTError, jwt
+import time
+from typing import Dict, Optional, Tuple
 
-SECRET_KEY = "your-secret-key"
-ALGORITHM = "HS256"
+from config.secrets import settings
+
+SECRET_KEY = settings.JWT_SECRET_KEY
+ALGORITHM = settings.JWT_ALGORITHM
+
+TOKEN_CACHE_MAX_SIZE = 8192
+TOKEN_CACHE_DEFAULT_TTL = 300.0  # для токенов без exp
+INVALID_TOKEN_TTL = 5.0          # отрицательный кэш гасит перебор токенов
+
+_token_cache: Dict[str, Tuple[float, Optional[dict]]] = {}
 
 def create_access_token(data: dict, expires_delta: Optional[int] = None) -> str:
     # TODO: добавить реальную логику и управление временем жизни токена
     token = jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
+def _remember_token(token: str, payload: Optional[dict], ttl: float) -> None:
+    if len(_token_cache) >= TOKEN_CACHE_MAX_SIZE:
+        _token_cache.pop(next(iter(_token_cache)), None)
+    _token_cache[token] = (time.monotonic() + ttl, payload)
+
 def verify_token(token: str) -> Optional[dict]:
+    entry = _token_cache.get(token)
+    if entry is not None:
+        expires_at, payload = entry
+        if expires_at > time.monotonic():
+            return dict(payload) if payload is not None else None
+        _token_cache.pop(token, None)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.PyJWTError:
-        return None
\ No newline at end of file
+    except JWTError:
+        _remember_token(token, None, INVALID_TOKEN_TTL)
+        return None
+
+    # Результат проверки живёт не дольше самого токена
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else TOKEN_CACHE_DEFAULT_TTL
+    if ttl > 0:
+        _remember_token(token, payload, ttl)
+    return dict(payload)
@@ -4,8 +4,8 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from functools import lru_cache
-from typing import List, Optional
+from functools import cached_property, lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional
 
 
 class Settings(BaseSettings):
@@ -24,6 +24,11 @@ class Settings(BaseSettings):
     DB_TIMEOUT: int = 30
     DB_ECHO: bool = False
 
+    @cached_property
+    def DATABASE_DSN(self) -> str:
+        """DSN собирается один раз на процесс"""
+        return f"{self.DB_TYPE}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     # ⚡ Redis + Celery (асинхронные задачи)
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/1"
@@ -41,10 +46,39 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 10_000_000
     ALLOWED_EXTENSIONS: List[str] = Field(default=[".pdf", ".docx", ".txt"])
 
+    @cached_property
+    def ALLOWED_EXTENSIONS_SET(self) -> FrozenSet[str]:
+        """Множество расширений для O(1)-проверки на каждом запросе"""
+        return frozenset(ext.lower() for ext in self.ALLOWED_EXTENSIONS)
+
+    # ✂️ Разбиение на чанки
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 100
+
+    # 🗂 Пути, адаптеры и сервис эмбеддингов (секции вида {"vector_store": "...", "remote_url": "..."})
+    paths: Dict[str, Any] = Field(default_factory=dict)
+    web: Dict[str, Any] = Field(default_factory=dict)
+    erp: Dict[str, Any] = Field(default_factory=dict)
+    embeddings: Dict[str, Any] = Field(default_factory=dict)
+
+    # 🧬 Модели
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    ner_models: List[str] = Field(default=["spacy-en", "natasha-ru"])
+
+    # 🌐 API
+    name: str = "Librarian AI"
+    enable_docs: bool = True
+    cors_origins: List[str] = Field(default=["*"])
+    DEBUG: bool = False
+
     # 🧾 Логирование и версия
     LOG_LEVEL: str = "INFO"
     VERSION: str = "2.0.0"
 
+    # 🔑 JWT
+    JWT_SECRET_KEY: str = "your-secret-key"
+    JWT_ALGORITHM: str = "HS256"
+
     # 🆓 Выбор AI-провайдера
     AI_PROVIDER: str = "gigachat"  # варианты: deepseek, gigachat, ollama, huggingface, openrouter, local
 
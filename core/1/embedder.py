@@ -6,12 +6,158 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
 import faiss
+import torch
 import os
+import asyncio
+import json
 import pickle
+import re
+
+try:
+    from transformers import AutoTokenizer
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+except ImportError:
+    ORTModelForFeatureExtraction = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODE_BATCH_SIZE = 64
+ENCODE_STREAM_SIZE = 10_000
+
+# Пороги выбора индекса (рекомендации Faiss): точный перебор для малых баз,
+# граф HNSW для средних, IVF+PQ для крупных
+FLAT_MAX_VECTORS = 100_000
+HNSW_MAX_VECTORS = 1_000_000
+TRAIN_SAMPLE_SIZE = 500_000
+IVF_NPROBE = 16
+HNSW_EF_SEARCH = 64
+
+# Потоки OpenMP для Faiss (env FAISS_THREADS): на многоядерных хостах число потоков по умолчанию
+# приводит к переподписке и замедлению; на малых индексах OpenMP только добавляет накладные расходы
+FAISS_THREADS = int(os.environ.get("FAISS_THREADS", min(16, os.cpu_count() or 1)))
+FAISS_SINGLE_THREAD_MAX_VECTORS = 10_000
+faiss.omp_set_num_threads(FAISS_THREADS)
+
+
+def gpu_faiss_available():
+    """faiss-gpu установлен и видит хотя бы одну видеокарту"""
+    return hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+
+
+# IVF с полными или SQ8-векторами поддерживается GPU-индексами при любой размерности;
+# у IVFPQ на GPU число подквантователей ограничено (PQ192 для 384-d не клонируется)
+_GPU_CLONABLE_SPEC_RE = re.compile(r"^IVF\d+,(Flat|SQ8)$")
+
+
+def choose_index_spec(n_vectors, dim, quantization="none"):
+    """
+    Строка faiss.index_factory по размеру корпуса
+    :param quantization: "sq8" — хранить векторы как int8 (в 4 раза меньше FP32)
+    """
+    sq8 = quantization == "sq8"
+    if n_vectors < FLAT_MAX_VECTORS:
+        return "SQ8" if sq8 else "Flat"
+    if n_vectors < HNSW_MAX_VECTORS:
+        return "HNSW32,SQ8" if sq8 else "HNSW32"
+    nlist = int(np.sqrt(n_vectors))
+    if sq8:
+        return f"IVF{nlist},SQ8"
+    m = dim // 2 if dim % 2 == 0 else dim
+    return f"IVF{nlist},PQ{m}x8"
+
+
+def _index_file(index_path, quantization):
+    """SQ8-индекс пишется с суффиксом .sq8, чтобы не перезаписать полноточный"""
+    if quantization == "sq8":
+        root, ext = os.path.splitext(index_path)
+        return f"{root}.sq8{ext}"
+    return index_path
+
+
+def _write_metadata(metadata, meta_path, meta_format="pickle"):
+    if meta_format == "pickle":
+        with open(meta_path, "wb") as f:
+            pickle.dump(metadata, f)
+    elif meta_format == "json":
+        with open(meta_path, "wb") as f:
+            if orjson is not None:
+                f.write(orjson.dumps(metadata))
+            else:
+                f.write(json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+    else:
+        raise ValueError(f"Неизвестный формат метаданных: {meta_format}")
+
+
+class _OnnxEncoder:
+    """
+    Замена SentenceTransformer поверх ONNX Runtime: токенизация, mean pooling
+    и L2-нормализация, как в sentence-transformers; форма выхода та же
+    """
+
+    def __init__(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model
+
+    def encode(self, texts, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        order = np.argsort([-len(t) for t in texts])
+        out = np.empty((len(texts), self.model.config.hidden_size), dtype="float32")
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            enc = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True, return_tensors="np")
+            hidden = np.asarray(self.model(**enc).last_hidden_state, dtype="float32")
+            mask = enc["attention_mask"][..., None].astype("float32")
+            out[idx] = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out
+
 
 class Embedder:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name="all-MiniLM-L6-v2", batch_size=ENCODE_BATCH_SIZE):
+        self.batch_size = batch_size
+        if torch.cuda.is_available():
+            # FP16 на GPU: вдвое меньше трафика памяти в матричных умножениях
+            self.model = SentenceTransformer(model_name, device="cuda").half()
+        else:
+            torch.set_num_threads(os.cpu_count() or 1)
+            self.model = SentenceTransformer(model_name, device="cpu")
+
+    @classmethod
+    def from_onnx(cls, model_name="all-MiniLM-L6-v2", quantize=True, save_dir="knowledge/onnx", batch_size=ENCODE_BATCH_SIZE):
+        """
+        Embedder на ONNX Runtime для CPU: экспорт модели и динамическая int8-квантизация (AVX512-VNNI)
+        :param model_name: имя модели sentence-transformers
+        :param quantize: квантизовать веса в int8
+        :param save_dir: каталог для экспортированной модели
+        """
+        if ORTModelForFeatureExtraction is None:
+            raise ImportError("ONNX backend requires optimum: pip install optimum[onnxruntime]")
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        model_dir = os.path.join(save_dir, repo_id.replace("/", "__"))
+        quantized_file = "model_quantized.onnx"
+
+        if not os.path.exists(os.path.join(model_dir, "model.onnx")):
+            model = ORTModelForFeatureExtraction.from_pretrained(repo_id, export=True)
+            model.save_pretrained(model_dir)
+            AutoTokenizer.from_pretrained(repo_id).save_pretrained(model_dir)
+        if quantize and not os.path.exists(os.path.join(model_dir, quantized_file)):
+            quantizer = ORTQuantizer.from_pretrained(model_dir)
+            qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=model_dir, quantization_config=qconfig)
+
+        model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, file_name=quantized_file if quantize else "model.onnx"
+        )
+        embedder = cls.__new__(cls)
+        embedder.batch_size = batch_size
+        embedder.model = _OnnxEncoder(AutoTokenizer.from_pretrained(model_dir), model)
+        return embedder
 
     def encode(self, texts):
         """
@@ -19,21 +165,115 @@ class Embedder:
         :param texts: List[str]
         :return: np.array векторов
         """
-        return self.model.encode(texts, convert_to_numpy=True)
+        # SentenceTransformer.encode сам сортирует тексты по длине внутри батчей
+        # и возвращает результат в исходном порядке
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            normalize_embeddings=True
+        )
+
+    async def aencode_batch(self, texts, batch_size=None):
+        """
+        Асинхронная векторизация батча: модель работает в отдельном потоке, цикл событий не блокируется
+        :param texts: List[str]
+        :return: np.array векторов
+        """
+        if batch_size is None:
+            return await asyncio.to_thread(self.encode, texts)
+        return await asyncio.to_thread(
+            self.model.encode,
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            normalize_embeddings=True
+        )
+
+    def encode_stream(self, texts, chunk_size=ENCODE_STREAM_SIZE):
+        """
+        Векторизация порциями: пиковая память ограничена chunk_size текстами
+        :param texts: List[str]
+        :return: генератор np.array векторов
+        """
+        for i in range(0, len(texts), chunk_size):
+            yield self.encode(texts[i:i + chunk_size])
 
-    def save_index(self, vectors, metadata, index_path="knowledge/vector_store/index.faiss", meta_path="knowledge/vector_store/meta.pkl"):
+    def _gpu_resources(self):
+        """Ресурсы GPU (временная память, потоки CUDA) создаются один раз на Embedder"""
+        if getattr(self, "_gpu_res", None) is None:
+            self._gpu_res = faiss.StandardGpuResources()
+        return self._gpu_res
+
+    def build_index(self, vectors, index_type=None, quantization="none"):
+        """
+        Строит и заполняет FAISS-индекс (без записи на диск)
+        :param vectors: np.array
+        :param index_type: строка для faiss.index_factory; по умолчанию выбирается по числу векторов
+        :param quantization: "sq8" | "none"
+        :return: faiss.Index
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        n, dim = vectors.shape
+        spec = index_type or choose_index_spec(n, dim, quantization)
+        index = faiss.index_factory(dim, spec)
+        # k-means и распределение по спискам IVF на GPU; Flat/SQ8 строятся простым копированием,
+        # HNSW на GPU не переносится, а IVFPQ собираем на CPU из-за ограничений GPU на PQ.
+        # GPU ускоряет только построение: перед записью индекс возвращается на CPU
+        # в исходном формате, поэтому опции FP16-хранения здесь ничего не экономят
+        use_gpu = bool(_GPU_CLONABLE_SPEC_RE.match(spec)) and gpu_faiss_available()
+        if use_gpu:
+            index = faiss.index_cpu_to_gpu(self._gpu_resources(), 0, index)
+        faiss.omp_set_num_threads(1 if n < FAISS_SINGLE_THREAD_MAX_VECTORS else FAISS_THREADS)
+        try:
+            if not index.is_trained:
+                sample = vectors
+                if n > TRAIN_SAMPLE_SIZE:
+                    sample = vectors[np.random.default_rng(0).choice(n, TRAIN_SAMPLE_SIZE, replace=False)]
+                index.train(sample)
+            index.add(vectors)
+        finally:
+            faiss.omp_set_num_threads(FAISS_THREADS)
+        if use_gpu:
+            index = faiss.index_gpu_to_cpu(index)
+
+        # Параметры поиска сохраняются вместе с индексом
+        params = faiss.ParameterSpace()
+        if spec.startswith("IVF"):
+            params.set_index_parameter(index, "nprobe", IVF_NPROBE)
+        elif spec.startswith("HNSW"):
+            params.set_index_parameter(index, "efSearch", HNSW_EF_SEARCH)
+        return index
+
+    def save_index(self, vectors, metadata, index_path="knowledge/vector_store/index.faiss", meta_path="knowledge/vector_store/meta.pkl", index_type=None, quantization="none", meta_format="pickle"):
         """
         Сохраняет FAISS-индекс и метаданные
         :param vectors: np.array
         :param metadata: List[dict]
+        :param index_type: строка для faiss.index_factory; по умолчанию выбирается по числу векторов
+        :param quantization: "sq8" | "none"; SQ8-индекс пишется с суффиксом .sq8 в имени файла
+        :param meta_format: "pickle" | "json"; JSON пишется через orjson, если он установлен
         """
-        dim = vectors.shape[1]
-        index = faiss.IndexFlatL2(dim)
-        index.add(vectors)
+        index = self.build_index(vectors, index_type, quantization)
+        index_path = _index_file(index_path, quantization)
         faiss.write_index(index, index_path)
+        _write_metadata(metadata, meta_path, meta_format)
 
-        with open(meta_path, "wb") as f:
-            pickle.dump(metadata, f)
+        print(f"💾 Индекс сохранён в {index_path}, метаданные — в {meta_path}")
+
+    async def asave_index(self, vectors, metadata, index_path="knowledge/vector_store/index.faiss", meta_path="knowledge/vector_store/meta.pkl", index_type=None, quantization="none", meta_format="pickle"):
+        """
+        Асинхронный save_index: построение и запись идут в потоках, цикл событий не блокируется;
+        индекс и метаданные пишутся параллельно
+        """
+        index = await asyncio.to_thread(self.build_index, vectors, index_type, quantization)
+        index_path = _index_file(index_path, quantization)
+        await asyncio.gather(
+            asyncio.to_thread(faiss.write_index, index, index_path),
+            asyncio.to_thread(_write_metadata, metadata, meta_path, meta_format)
+        )
 
         print(f"💾 Индекс сохранён в {index_path}, метаданные — в {meta_path}")
 
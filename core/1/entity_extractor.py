@@ -19,13 +19,13 @@
 # 📄 Файл: entity_extractor.py
 # 📂 Путь установки: librarian_ai/core/entity_extractor.py
 
+import os
 import re
 import logging
-import concurrent.futures
 import natasha
 import networkx as nx
 import matplotlib.pyplot as plt
-from collections import defaultdict
+from collections import Counter
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Tuple
 
@@ -34,10 +34,22 @@ try:
 except ImportError:
     spacy = None
 
+try:
+    from dateutil.parser import parse as _parse_date
+except ImportError:
+    _parse_date = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+_WHITESPACE_RE = re.compile(r'\s+')
+_ORG_SUFFIX_RE = re.compile(r'\b(LLC|Inc|Corp|Ltd|ООО|АО|ЗАО)\b', re.IGNORECASE)
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+SPACY_BATCH_SIZE = 32
+PARALLEL_MIN_TEXTS = 5  # на коротких списках fork процессов spaCy дороже выигрыша
+
+@dataclass(slots=True)
 class Entity:
     label: str
     text: str
@@ -50,10 +62,11 @@ class EntityExtractor:
                  enable_multiprocessing: bool = True):
         self.lang = lang
         self.custom_patterns = custom_patterns or {}
+        self._compiled_custom = {label: re.compile(p) for label, p in self.custom_patterns.items()}
         self.enable_multiprocessing = enable_multiprocessing
         self._init_nlp_models()
         self._normalization_cache = {}
-        self.extraction_stats = defaultdict(int)
+        self.extraction_stats = Counter()
 
     def _init_nlp_models(self):
         self.models = {}
@@ -106,10 +119,11 @@ class EntityExtractor:
             self.models = {}
             self.nlp = None
 
-    def _extract_with_spacy(self, text: str) -> List[Entity]:
-        if not hasattr(self, 'nlp') or self.nlp is None:
-            return []
-        doc = self.nlp(text)
+    def _extract_with_spacy(self, text: str, doc=None) -> List[Entity]:
+        if doc is None:
+            if not hasattr(self, 'nlp') or self.nlp is None:
+                return []
+            doc = self.nlp(text)
         return [Entity(label=ent.label_, text=ent.text, value=ent.text,
                        context=self._get_context(text, ent.start_char, ent.end_char), confidence=0.9)
                 for ent in doc.ents]
@@ -135,8 +149,8 @@ class EntityExtractor:
 
     def _extract_custom(self, text: str) -> List[Entity]:
         entities = []
-        for label, pattern in self.custom_patterns.items():
-            for match in re.finditer(pattern, text):
+        for label, pattern in self._compiled_custom.items():
+            for match in pattern.finditer(text):
                 entities.append(Entity(
                     label=label,
                     text=match.group(),
@@ -158,16 +172,15 @@ class EntityExtractor:
         norm_value = entity.value
 
         if entity.label in ["PERSON", "PER"]:
-            parts = [p.strip() for p in re.split(r'\s+', norm_value) if p.strip()]
+            parts = [p.strip() for p in _WHITESPACE_RE.split(norm_value) if p.strip()]
             if len(parts) > 1:
                 norm_value = f"{parts[0]} {'.'.join([p[0] for p in parts[1:] if p])}."
         elif entity.label in ["ORG", "ORGANIZATION"]:
-            norm_value = re.sub(r'\b(LLC|Inc|Corp|Ltd|ООО|АО|ЗАО)\b', '', norm_value, flags=re.IGNORECASE)
-            norm_value = re.sub(r'[^\w\s]', '', norm_value).strip().title()
-        elif entity.label == "DATE":
+            norm_value = _ORG_SUFFIX_RE.sub('', norm_value)
+            norm_value = _NON_WORD_RE.sub('', norm_value).strip().title()
+        elif entity.label == "DATE" and _parse_date is not None:
             try:
-                from dateutil.parser import parse
-                dt = parse(norm_value)
+                dt = _parse_date(norm_value)
                 norm_value = dt.strftime("%Y-%m-%d")
             except:
                 pass
@@ -183,16 +196,13 @@ class EntityExtractor:
         return norm_entity
 
     def _post_process(self, entities: List[Entity]) -> List[Entity]:
-        normalized = [self._normalize_entity(e) for e in entities]
-        seen = set()
-        unique = []
-        for e in normalized:
-            key = (e.label, e.value.lower())
-            if key not in seen:
-                seen.add(key)
-                unique.append(e)
-                self.extraction_stats[e.label] += 1
-        return unique
+        # Один проход: dict сохраняет порядок первого вхождения и сразу дедуплицирует
+        unique: Dict[Tuple[str, str], Entity] = {}
+        for e in entities:
+            e = self._normalize_entity(e)
+            unique.setdefault((e.label, e.value.casefold()), e)
+        self.extraction_stats.update(e.label for e in unique.values())
+        return list(unique.values())
 
     def extract_entities(self, text: str) -> List[Entity]:
         import time
@@ -213,10 +223,23 @@ class EntityExtractor:
             return []
 
     def batch_extract(self, texts: List[str]) -> List[List[Entity]]:
-        if not self.enable_multiprocessing or len(texts) < 5:
+        nlp = getattr(self, 'nlp', None)
+        if nlp is None or self.lang not in ["en", "multi", "de", "fr"]:
             return [self.extract_entities(t) for t in texts]
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            return list(executor.map(self.extract_entities, texts))
+
+        # spaCy прогоняет весь список пачками через nlp.pipe; процессы форкаются один раз
+        # на вызов, а не по процессу с копией моделей на каждый текст
+        n_process = (os.cpu_count() or 1) if self.enable_multiprocessing and len(texts) >= PARALLEL_MIN_TEXTS else 1
+        results = []
+        try:
+            for text, doc in zip(texts, nlp.pipe(texts, batch_size=SPACY_BATCH_SIZE, n_process=n_process)):
+                raw = self._extract_with_spacy(text, doc) + self._extract_custom(text)
+                results.append(self._post_process(raw))
+        except Exception as e:
+            logger.error(f"Error during batch entity extraction: {str(e)}")
+            # Уже обработанные тексты учтены в extraction_stats — доизвлекаем только оставшиеся
+            results.extend(self.extract_entities(t) for t in texts[len(results):])
+        return results
 
     def visualize_entities(self, entities: List[Entity], filename: Optional[str] = None):
         G = nx.Graph()
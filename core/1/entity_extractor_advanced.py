@@ -5,13 +5,13 @@ import re
 import json
 import yaml
 import time
+import os
+import hashlib
 import logging
-import concurrent.futures
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Tuple
-from collections import defaultdict
+from collections import Counter, OrderedDict
 from pathlib import Path
-from functools import lru_cache
 from importlib import import_module
 
 try:
@@ -24,7 +24,27 @@ try:
 except ImportError:
     spacy = None
 
-@dataclass
+try:
+    from dateutil.parser import parse as _parse_date
+except ImportError:
+    _parse_date = None
+
+try:
+    from babel.numbers import parse_decimal as _parse_decimal
+except ImportError:
+    _parse_decimal = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+@dataclass(slots=True)
 class Entity:
     label: str
     text: str
@@ -35,22 +55,42 @@ class Entity:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_WORD_CHAR_RE = re.compile(r"\w")
+_WHITESPACE_RE = re.compile(r'\s+')
+_ORG_SUFFIX_RE = re.compile(r'\b(LLC|Inc|Corp|Ltd|ООО|АО|ЗАО)\b', re.IGNORECASE)
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+SPACY_BATCH_SIZE = 32
+EXTRACT_CACHE_MAX_SIZE = 1024
+PARALLEL_MIN_TEXTS = 5  # на коротких списках fork процессов spaCy дороже выигрыша
+
+def _text_key(text: str) -> int:
+    data = text.encode()
+    if xxhash is not None:
+        return xxhash.xxh64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
 class EntityExtractor:
     def __init__(self, lang: str = "ru", custom_patterns: Optional[Dict[str, str]] = None,
                  enable_multiprocessing: bool = True, enable_caching: bool = True,
                  custom_dicts: Optional[Dict[str, List[str]]] = None, plugins: List[str] = None):
         self.lang = lang
         self.custom_patterns = custom_patterns or {}
+        self._compiled_custom = {label: re.compile(p) for label, p in self.custom_patterns.items()}
         self.enable_multiprocessing = enable_multiprocessing
         self._cache_enabled = enable_caching
+        self._extract_cache: "OrderedDict[int, List[Entity]]" = OrderedDict()
+        self._extract_cache_max = EXTRACT_CACHE_MAX_SIZE
         self.custom_dicts = custom_dicts or {}
         self._init_nlp_models()
         self._load_custom_dicts()
         self._load_plugins(plugins or [])
         self._normalization_cache = {}
-        self.extraction_stats = defaultdict(int)
+        self.extraction_stats = Counter()
         self._setup_telemetry()
     def _setup_telemetry(self):
+        self._hit_count = 0
+        self._miss_count = 0
         self.telemetry = {
             'extraction_time': 0.0,
             'processed_chars': 0,
@@ -113,8 +153,23 @@ class EntityExtractor:
     def _load_custom_dicts(self):
         self.dict_patterns = {}
         for label, entries in self.custom_dicts.items():
-            pattern = r"\b(" + "|".join(re.escape(e) for e in entries) + r")\b"
+            # Длинные варианты первыми: alternation берёт первый подошедший, а нужен самый длинный
+            ordered = sorted(entries, key=len, reverse=True)
+            pattern = r"\b(" + "|".join(re.escape(e) for e in ordered) + r")\b"
             self.dict_patterns[label] = re.compile(pattern, flags=re.IGNORECASE)
+        self._ac = None
+        if ahocorasick is not None and self.custom_dicts:
+            # Один автомат на все словари: один линейный проход по тексту вместо прохода на метку
+            merged: Dict[str, List[str]] = {}
+            for label, entries in self.custom_dicts.items():
+                for e in entries:
+                    labels = merged.setdefault(e.lower(), [])
+                    if label not in labels:
+                        labels.append(label)
+            self._ac = ahocorasick.Automaton()
+            for key, labels in merged.items():
+                self._ac.add_word(key, (len(key), tuple(labels)))
+            self._ac.make_automaton()
 
     def _load_plugins(self, plugin_paths):
         self.plugins = []
@@ -140,17 +195,18 @@ class EntityExtractor:
                                       context=self._get_context(text, *span), confidence=0.85))
         return results
 
-    def _extract_with_spacy(self, text: str) -> List[Entity]:
-        if not hasattr(self, 'nlp') or self.nlp is None:
-            return []
-        doc = self.nlp(text)
+    def _extract_with_spacy(self, text: str, doc=None) -> List[Entity]:
+        if doc is None:
+            if not hasattr(self, 'nlp') or self.nlp is None:
+                return []
+            doc = self.nlp(text)
         return [Entity(label=ent.label_, text=ent.text, value=ent.text,
                        context=self._get_context(text, ent.start_char, ent.end_char), confidence=0.9)
                 for ent in doc.ents]
     def _extract_custom(self, text: str) -> List[Entity]:
         entities = []
-        for label, pattern in self.custom_patterns.items():
-            for match in re.finditer(pattern, text):
+        for label, pattern in self._compiled_custom.items():
+            for match in pattern.finditer(text):
                 entities.append(Entity(
                     label=label,
                     text=match.group(),
@@ -161,6 +217,10 @@ class EntityExtractor:
         return entities
 
     def _extract_from_dicts(self, text: str) -> List[Entity]:
+        lowered = text.lower()
+        # lower() может менять длину строки (напр. «İ») — тогда смещения не совпадут, идём через regex
+        if self._ac is not None and len(lowered) == len(text):
+            return self._extract_from_automaton(text, lowered)
         entities = []
         for label, pattern in self.dict_patterns.items():
             for match in pattern.finditer(text):
@@ -173,6 +233,34 @@ class EntityExtractor:
                 ))
         return entities
 
+    def _extract_from_automaton(self, text: str, lowered: str) -> List[Entity]:
+        # Автомат отдаёт все вхождения, в том числе вложенные («New York» и «York»)
+        hits: Dict[str, List[Tuple[int, int]]] = {}
+        for end, (length, labels) in self._ac.iter(lowered):
+            start, stop = end - length + 1, end + 1
+            # Та же граница слова, что и \b в regex-варианте
+            if (start > 0 and _WORD_CHAR_RE.match(text, start - 1)) or _WORD_CHAR_RE.match(text, stop):
+                continue
+            for label in labels:
+                hits.setdefault(label, []).append((start, stop))
+        entities = []
+        # Как finditer: по каждой метке самое левое, затем самое длинное вхождение, без перекрытий
+        for label in self.dict_patterns:
+            last_stop = 0
+            for start, stop in sorted(hits.get(label, ()), key=lambda span: (span[0], -span[1])):
+                if start < last_stop:
+                    continue
+                last_stop = stop
+                match = text[start:stop]
+                entities.append(Entity(
+                    label=label,
+                    text=match,
+                    value=match,
+                    context=self._get_context(text, start, stop),
+                    confidence=0.95
+                ))
+        return entities
+
     def _extract_with_plugins(self, text: str) -> List[Entity]:
         entities = []
         for plugin in self.plugins:
@@ -187,24 +275,25 @@ class EntityExtractor:
         return text[max(0, start - window):min(len(text), end + window)]
     def _normalize_entity(self, entity: Entity) -> Entity:
         key = f"{entity.label}:{entity.text.lower()}"
-        if key in self._normalization_cache:
-            return self._normalization_cache[key]
+        cached = self._normalization_cache.get(key)
+        if cached is not None:
+            self._hit_count += 1
+            return cached
+        self._miss_count += 1
         norm_value = entity.value
         try:
             if entity.label in ["PERSON", "PER"]:
-                parts = re.split(r'\s+', norm_value)
+                parts = _WHITESPACE_RE.split(norm_value)
                 if len(parts) > 1:
                     norm_value = f"{parts[0]} {'.'.join([p[0] for p in parts[1:] if p])}."
             elif entity.label in ["ORG", "ORGANIZATION"]:
-                norm_value = re.sub(r'\b(LLC|Inc|Corp|Ltd|ООО|АО|ЗАО)\b', '', norm_value, flags=re.IGNORECASE)
-                norm_value = re.sub(r'[^\w\s]', '', norm_value).strip().title()
-            elif entity.label == "DATE":
-                from dateutil.parser import parse
-                dt = parse(norm_value, fuzzy=True)
+                norm_value = _ORG_SUFFIX_RE.sub('', norm_value)
+                norm_value = _NON_WORD_RE.sub('', norm_value).strip().title()
+            elif entity.label == "DATE" and _parse_date is not None:
+                dt = _parse_date(norm_value, fuzzy=True)
                 norm_value = dt.strftime("%Y-%m-%d")
-            elif entity.label in ["MONEY", "QUANTITY"]:
-                from babel.numbers import parse_decimal
-                norm_value = str(parse_decimal(norm_value.replace(",", ".")))
+            elif entity.label in ["MONEY", "QUANTITY"] and _parse_decimal is not None:
+                norm_value = str(_parse_decimal(norm_value.replace(",", ".")))
         except:
             pass
         norm_entity = Entity(label=entity.label, text=entity.text, value=norm_value,
@@ -213,32 +302,41 @@ class EntityExtractor:
         return norm_entity
 
     def _post_process(self, entities: List[Entity]) -> List[Entity]:
-        seen = set()
-        result = []
-        for e in map(self._normalize_entity, entities):
-            key = (e.label, e.value.lower())
-            if key not in seen:
-                seen.add(key)
-                result.append(e)
-                self.extraction_stats[e.label] += 1
+        # Один проход: dict сохраняет порядок первого вхождения и сразу дедуплицирует
+        unique: Dict[Tuple[str, str], Entity] = {}
+        for e in entities:
+            e = self._normalize_entity(e)
+            unique.setdefault((e.label, e.value.casefold()), e)
+        self.extraction_stats.update(e.label for e in unique.values())
+        return list(unique.values())
+
+    def _cached_extract(self, text: str, doc=None) -> List[Entity]:
+        # Ключ — 64-битный хэш текста: словарь сравнивает int, а не многокилобайтные строки,
+        # и кэш не держит ссылку на self, как lru_cache на методе
+        key = _text_key(text)
+        cached = self._extract_cache.get(key)
+        if cached is not None:
+            self._extract_cache.move_to_end(key)
+            return cached
+        result = self._raw_extract(text, doc)
+        self._extract_cache[key] = result
+        if len(self._extract_cache) > self._extract_cache_max:
+            self._extract_cache.popitem(last=False)
         return result
-    @lru_cache(maxsize=1000)
-    def _cached_extract(self, text: str) -> List[Entity]:
-        return self._raw_extract(text)
 
-    def _raw_extract(self, text: str) -> List[Entity]:
+    def _raw_extract(self, text: str, doc=None) -> List[Entity]:
         raw = []
         if self.lang == "ru" and self.models:
             raw += self._extract_with_natasha(text)
         elif self.lang in ["en", "multi", "de", "fr"] and hasattr(self, 'nlp'):
-            raw += self._extract_with_spacy(text)
+            raw += self._extract_with_spacy(text, doc)
         raw += self._extract_custom(text)
         raw += self._extract_from_dicts(text)
         raw += self._extract_with_plugins(text)
         return self._post_process(raw)
 
     def extract_entities(self, text: str) -> List[Entity]:
-         if not text or not isinstance(text, str):
+        if not text or not isinstance(text, str):
             return []
 
         start_time = time.time()
@@ -249,26 +347,46 @@ class EntityExtractor:
         return result
 
     def batch_extract(self, texts: List[str]) -> List[List[Entity]]:
-        if not self.enable_multiprocessing or len(texts) < 5:
+        nlp = getattr(self, 'nlp', None)
+        if nlp is None or self.lang not in ["en", "multi", "de", "fr"]:
             return [self.extract_entities(t) for t in texts]
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            return list(executor.map(self.extract_entities, texts))
+
+        # spaCy прогоняет весь список пачками через nlp.pipe; процессы форкаются один раз
+        # на вызов, а не по процессу с копией моделей на каждый текст
+        valid = [i for i, t in enumerate(texts) if t and isinstance(t, str)]
+        results: List[List[Entity]] = [[] for _ in texts]
+        start_time = time.time()
+        if self._cache_enabled:
+            # Тексты из кэша в spaCy не отправляем
+            pending = []
+            for i in valid:
+                cached = self._extract_cache.get(_text_key(texts[i]))
+                if cached is None:
+                    pending.append(i)
+                else:
+                    results[i] = cached
+        else:
+            pending = valid
+        n_process = (os.cpu_count() or 1) if self.enable_multiprocessing and len(pending) >= PARALLEL_MIN_TEXTS else 1
+        extract = self._cached_extract if self._cache_enabled else self._raw_extract
+        docs = nlp.pipe((texts[i] for i in pending), batch_size=SPACY_BATCH_SIZE, n_process=n_process)
+        for i, doc in zip(pending, docs):
+            results[i] = extract(texts[i], doc)
+        self._update_telemetry(time.time() - start_time, sum(len(texts[i]) for i in valid))
+        return results
     def _update_telemetry(self, elapsed_time: float, chars_processed: int):
         self.telemetry['extraction_time'] += elapsed_time
         self.telemetry['processed_chars'] += chars_processed
-        self.telemetry['cache_hits'] = len(self._normalization_cache)
-        self.telemetry['cache_misses'] = sum(v == 0 for v in self._normalization_cache.values())
+        # Счётчики ведёт _normalize_entity — без прохода по всему кэшу на каждый документ
+        self.telemetry['cache_hits'] = self._hit_count
+        self.telemetry['cache_misses'] = self._miss_count
 
     def get_telemetry(self) -> Dict[str, float]:
         return self.telemetry
 
     def reset_stats(self):
         self.extraction_stats.clear()
-        self.telemetry = {
-            'extraction_time': 0.0,
-            'processed_chars': 0,
-            'cache_hits': 0,
-            'cache_misses': 0
-        }
+        self._setup_telemetry()
         self._normalization_cache.clear()
+        self._extract_cache.clear()
 
@@ -11,26 +11,51 @@
 # 3. 🇷🇺 Поддержка русского языка через мультиязычные модели
 # 4. 🔬 Предобработка: удаление пунктуации, лемматизация, стоп-слова
 
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from sentence_transformers import CrossEncoder
+import torch
+import re
 import string
+from functools import lru_cache
 from pymorphy2 import MorphAnalyzer
 
 morph = MorphAnalyzer()
 
+# Слова из букв любого алфавита (без цифр и подчёркиваний)
+_TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+RERANK_BATCH_SIZE = 32
+
+
+@lru_cache(maxsize=1 << 18)
+def _lemma(word: str) -> str:
+    """Нормальная форма слова; словарь корпуса повторяется, поэтому разбор кэшируется."""
+    return morph.parse(word)[0].normal_form
+
+
 class ReRanker:
-    def __init__(self, model_name="DeepPavlov/rubert-base-cased-conversational"):
-        self.model = CrossEncoder(model_name)
+    def __init__(self, model_name="DeepPavlov/rubert-base-cased-conversational",
+                 preprocess_fn: Optional[Callable[[str], str]] = None):
+        """
+        :param preprocess_fn: нормализация текста перед моделью (например, ReRanker.preprocess);
+            по умолчанию не применяется — CrossEncoder обучен на естественном тексте
+        """
+        self.preprocess_fn = preprocess_fn
+        if torch.cuda.is_available():
+            # На GPU — FP16: вдвое меньше памяти и тензорные ядра
+            self.model = CrossEncoder(model_name, device="cuda")
+            self.model.model.half()
+        else:
+            self.model = CrossEncoder(model_name)
 
     def lemmatize(self, word: str) -> str:
         """Приводит слово к нормальной форме."""
-        return morph.parse(word)[0].normal_form
+        return _lemma(word)
 
-    def preprocess(self, text: str) -> str:
+    @staticmethod
+    def preprocess(text: str) -> str:
         """Нормализация текста: лемматизация, очистка от пунктуации и цифр."""
-        words = text.split()
-        clean_words = [self.lemmatize(w) for w in words if w.isalpha()]
-        return ' '.join(clean_words)
+        return ' '.join(_lemma(m.group()) for m in _TOKEN_RE.finditer(text.lower()))
 
     def rerank(self, query: str, docs: List[Dict], top_k: int = 5) -> List[Dict]:
         """
@@ -40,11 +65,22 @@ class ReRanker:
         :param top_k: количество топ-документов
         :return: список top_k документов по убыванию релевантности
         """
-        query_clean = self.preprocess(query)
-        pairs = [[query_clean, self.preprocess(doc["text"])] for doc in docs]
-        scores = self.model.predict(pairs)
+        if not docs:
+            return []
+        if self.preprocess_fn is None:
+            pairs = [[query, doc["text"]] for doc in docs]
+        else:
+            query_clean = self.preprocess_fn(query)
+            pairs = [[query_clean, self.preprocess_fn(doc["text"])] for doc in docs]
+        # Пары близкой длины в одном батче — меньше паддинга
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        scores = self.model.predict(
+            [pairs[i] for i in order],
+            batch_size=RERANK_BATCH_SIZE,
+            show_progress_bar=False
+        )
 
-        for i, score in enumerate(scores):
+        for i, score in zip(order, scores):
             docs[i]["score"] = float(score)
 
         return sorted(docs, key=lambda x: x["score"], reverse=True)[:top_k]
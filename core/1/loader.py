@@ -2,6 +2,7 @@
 # Заменим вызов extract_files_from_archive() временно — архивы отключены
 
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from utils.file_utils import (
     extract_text_from_pdf,
     extract_text_from_docx,
@@ -14,33 +15,38 @@ from utils.file_utils import (
 )
 from typing import Optional
 
+# Текстовые форматы разбираются быстро — гоняем их в потоках, без pickle и запуска процессов
+_TEXT_EXTS = frozenset({".txt", ".md", ".html", ".htm"})
+
+_ARCHIVE_EXTS = frozenset({".zip", ".rar", ".7z"})
+
+# Расширение → функция извлечения текста; новый формат: _EXT_DISPATCH[ext] = fn
+_EXT_DISPATCH = {
+    ".pdf": extract_text_from_pdf,
+    ".docx": extract_text_from_docx,
+    ".pptx": extract_text_from_pptx,
+    ".xlsx": extract_text_from_xlsx,
+    ".odt": extract_text_from_odf,
+    ".html": extract_text_from_html,
+    ".htm": extract_text_from_html,
+    ".txt": extract_text_from_txt,
+    ".md": extract_text_from_txt,
+    **dict.fromkeys((".jpg", ".jpeg", ".png", ".bmp", ".tiff"), extract_text_from_image),
+}
+
 def load_file(path: str) -> str:
     ext = os.path.splitext(path)[-1].lower()
-    
+
     # ❌ Временно отключаем архивы
-    if ext in [".zip", ".rar", ".7z"]:
+    if ext in _ARCHIVE_EXTS:
         raise NotImplementedError("Обработка архивов временно отключена. Установите компилятор MSVC.")
 
-    if ext == ".pdf":
-        return extract_text_from_pdf(path)
-    elif ext == ".docx":
-        return extract_text_from_docx(path)
-    elif ext == ".pptx":
-        return extract_text_from_pptx(path)
-    elif ext == ".xlsx":
-        return extract_text_from_xlsx(path)
-    elif ext == ".odt":
-        return extract_text_from_odf(path)
-    elif ext in [".html", ".htm"]:
-        return extract_text_from_html(path)
-    elif ext in [".txt", ".md"]:
-        return extract_text_from_txt(path)
-    elif ext in [".jpg", ".jpeg", ".png", ".bmp", ".tiff"]:
-        return extract_text_from_image(path)
-    else:
+    extract = _EXT_DISPATCH.get(ext)
+    if extract is None:
         raise ValueError(f"Неподдерживаемый тип файла: {ext}")
-    
-    
+    return extract(path)
+
+
 def load_file_to_knowledge(path: str, session_id: Optional[str] = None):
     print(f"[DEBUG] Загрузка файла в базу знаний: {path}, session: {session_id}")
     content = load_file(path)
@@ -49,9 +55,26 @@ def load_file_to_knowledge(path: str, session_id: Optional[str] = None):
 
 def parallel_load_files(folder: str, session_id: Optional[str] = None):
     print(f"[DEBUG] Параллельная загрузка из папки: {folder}, session: {session_id}")
+    text_paths, heavy_paths = [], []
     for root, _, files in os.walk(folder):
         for f in files:
-            try:
-                load_file_to_knowledge(os.path.join(root, f), session_id)
-            except Exception as e:
-                print(f"[ERROR] Ошибка при обработке {f}: {e}")
\ No newline at end of file
+            path = os.path.join(root, f)
+            (text_paths if os.path.splitext(f)[-1].lower() in _TEXT_EXTS else heavy_paths).append(path)
+
+    # PDF/DOCX/OCR упираются в CPU — по процессам; текстовые файлы — в пуле потоков
+    workers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        futures = {threads.submit(load_file_to_knowledge, p, session_id): p for p in text_paths}
+        if heavy_paths:
+            with ProcessPoolExecutor(max_workers=min(workers, len(heavy_paths))) as processes:
+                futures.update({processes.submit(load_file_to_knowledge, p, session_id): p for p in heavy_paths})
+                _report_failures(futures)
+        else:
+            _report_failures(futures)
+
+def _report_failures(futures):
+    for future in as_completed(futures):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"[ERROR] Ошибка при обработке {os.path.basename(futures[future])}: {e}")
@@ -4,6 +4,7 @@
 # 📤 Передаёт: чистый текст и метаинформацию (название, дата, автор и пр.)
 # Файл parser.py создан. Он извлекает текст и базовую метаинформацию (имя, размер) из .txt-файлов. Позже можно подключить поддержку PDF, DOCX и HTML.
 
+import mmap
 import os
 
 # TODO: подключить парсеры PDF, DOCX, HTML при необходимости
@@ -15,11 +16,20 @@ def parse_text_file(filepath):
     :return: словарь с текстом и метаинформацией
     """
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            text = f.read()
+        with open(filepath, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                # Декодируем прямо из отображения страниц: без буферов текстового режима
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    text = mm[:].decode("utf-8")
+            else:
+                text = ""  # mmap не отображает пустые файлы
+        if "\r" in text:
+            # Как универсальные переводы строк в текстовом режиме open()
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
         meta = {
             "filename": os.path.basename(filepath),
-            "size_kb": round(os.path.getsize(filepath) / 1024, 2)
+            "size_kb": round(size / 1024, 2)
         }
         return {"text": text, "meta": meta}
     except Exception as e:
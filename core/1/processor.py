@@ -1,5 +1,10 @@
 # 📄 core/processor.py
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 class DocumentProcessor:
     def __init__(
         self,
@@ -10,10 +15,14 @@ class DocumentProcessor:
         metrics_registry=None,
         max_retries: int = 3,
         health_check_interval: int = 60,
-        cache_ttl: int = 3600
+        cache_ttl: int = 3600,
+        strong_hash: bool = False
     ):
         """
         Full-cycle industrial document processor.
+
+        strong_hash: key the embedding cache on SHA-256 (auditable) instead of
+        the much faster non-cryptographic xxh3_128.
         """
         self.vector_store = vector_store
         self.embedder = embedder or Embedder()
@@ -22,6 +31,13 @@ class DocumentProcessor:
         self.max_retries = max_retries
         self.health_check_interval = health_check_interval
         self.cache_ttl = cache_ttl
+        self.strong_hash = strong_hash
+        if strong_hash:
+            self._cache_prefix = "emb:"
+        elif xxhash is not None:
+            self._cache_prefix = "emb:xxh3:"
+        else:
+            self._cache_prefix = "emb:b2:"
         self._setup_metrics(metrics_registry)
         self.health_status = HealthStatus()
         self._processing_lock = asyncio.Lock()
@@ -125,16 +141,15 @@ class DocumentProcessor:
             self.metrics['queue_size'].inc()
             
             try:
-                # Vectorization
-                embeddings = []
-                async for emb in self._embed_chunks_safe(chunks, source_path, **kwargs):
-                    embeddings.append(emb)
-                
-                # Entity Extraction
-                entities = await self._extract_entities_safe(
-                    chunks,
-                    session_id=session_id,
-                    **kwargs.get('extract_params', {})
+                # Vectorization and entity extraction overlap: embedding waits on
+                # the model/cache while NER keeps the CPU busy
+                embeddings, entities = await asyncio.gather(
+                    self._collect_embeddings(chunks, source_path, **kwargs),
+                    self._extract_entities_safe(
+                        chunks,
+                        session_id=session_id,
+                        **kwargs.get('extract_params', {})
+                    )
                 )
                 
                 logger.info(
@@ -149,43 +164,116 @@ class DocumentProcessor:
             finally:
                 self.metrics['queue_size'].dec()
 
-    async def _embed_chunks_safe(self, chunks: List[str], source_path: str, **kwargs) -> AsyncIterator:
-        """Safe streaming embedding generation."""
-        for idx, chunk in enumerate(chunks):
-            start_time = datetime.utcnow()
-            try:
-                text_hash = hashlib.sha256(chunk.encode()).hexdigest()
-                cache_key = f"emb:{text_hash}"
-                
-                # Try reading from cache
-                if self.health_status.cache:
-                    cached = await self._get_from_cache(cache_key)
-                    if cached:
-                        yield cached['vector'], cached['meta']
-                        continue
-                
-                # Generate embedding
-                vector = await self.embedder.aencode(chunk)
-                
-                # Metadata creation
-                meta = ChunkMetadata(
-                    source_path=source_path,
-                    text_hash=text_hash,
-                    chunk_index=idx,
-                    custom_fields=kwargs
-                ).dict()
-                
-                # Save to store/cache
-                await self._persist_embedding(vector, meta, cache_key)
-                
-                yield vector, meta
-                
-            except Exception as e:
-                logger.error(f"Chunk processing failed: {str(e)}")
-                continue
-            finally:
-                duration = (datetime.utcnow() - start_time).total_seconds()
-                self.metrics['processing_time'].labels(stage='embedding').observe(duration)
+    async def _collect_embeddings(self, chunks: List[str], source_path: str, **kwargs) -> List[Optional[Tuple[np.ndarray, Dict]]]:
+        """
+        Embed each distinct chunk once (repeated headers/footers/boilerplate) and
+        scatter the results back to the original positions. Chunks whose
+        embedding failed are None, so the list always lines up with `chunks`.
+        """
+        first_seen: Dict[str, int] = {}
+        unique: List[str] = []
+        unique_indices: List[int] = []
+        positions: List[int] = []
+        for i, chunk in enumerate(chunks):
+            pos = first_seen.get(chunk)
+            if pos is None:
+                pos = first_seen[chunk] = len(unique)
+                unique.append(chunk)
+                unique_indices.append(i)
+            positions.append(pos)
+
+        by_unique: List[Optional[Tuple[np.ndarray, Dict]]] = [None] * len(unique)
+        async for idx, vector, meta in self._embed_chunks_safe(
+            unique, source_path, chunk_indices=unique_indices, **kwargs
+        ):
+            by_unique[idx] = (vector, meta)
+
+        # Every position gets its own metadata record with its own chunk_index
+        results: List[Optional[Tuple[np.ndarray, Dict]]] = []
+        for i, pos in enumerate(positions):
+            hit = by_unique[pos]
+            results.append(None if hit is None else (hit[0], {**hit[1], 'chunk_index': i}))
+        return results
+
+    async def _embed_chunks_safe(
+        self,
+        chunks: List[str],
+        source_path: str,
+        chunk_indices: Optional[List[int]] = None,
+        **kwargs
+    ) -> AsyncIterator:
+        """
+        Safe streaming embedding generation: one cache round-trip, one batched encode.
+        Yields (chunk index, vector, metadata); chunks that failed are skipped.
+        `chunk_indices` maps each chunk to its position in the source document
+        (defaults to its position in `chunks`).
+        """
+        start_time = datetime.utcnow()
+        try:
+            hashes = [self._hash_chunk(chunk) for chunk in chunks]
+            cache_keys = [f"{self._cache_prefix}{text_hash}" for text_hash in hashes]
+
+            # Read all cached vectors at once
+            cached = [None] * len(chunks)
+            if self.health_status.cache:
+                try:
+                    cached = await self._get_many_from_cache(cache_keys)
+                except Exception as e:
+                    logger.warning(f"Cache read failed: {str(e)}")
+
+            # Encode only the misses, in a single batch
+            missing = [idx for idx, hit in enumerate(cached) if not hit]
+            fresh = {}
+            if missing:
+                try:
+                    vectors = await self.embedder.aencode_batch([chunks[idx] for idx in missing])
+                except Exception as e:
+                    logger.error(f"Chunk processing failed: {str(e)}")
+                    vectors = []
+                for idx, vector in zip(missing, vectors):
+                    meta = ChunkMetadata(
+                        source_path=source_path,
+                        text_hash=hashes[idx],
+                        chunk_index=chunk_indices[idx] if chunk_indices else idx,
+                        custom_fields=kwargs
+                    ).dict()
+                    fresh[idx] = (vector, meta)
+
+                # Save to store/cache concurrently
+                results = await asyncio.gather(
+                    *(self._persist_embedding(vector, meta, cache_keys[idx]) for idx, (vector, meta) in fresh.items()),
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Chunk processing failed: {str(result)}")
+
+            # Yield in original order
+            for idx in range(len(chunks)):
+                if cached[idx]:
+                    yield idx, cached[idx]['vector'], cached[idx]['meta']
+                elif idx in fresh:
+                    yield (idx, *fresh[idx])
+        finally:
+            duration = (datetime.utcnow() - start_time).total_seconds()
+            self.metrics['processing_time'].labels(stage='embedding').observe(duration)
+
+    def _hash_chunk(self, chunk: str) -> str:
+        """Cache key digest for a chunk; the prefix keeps the schemes from mixing."""
+        data = chunk.encode()
+        if self.strong_hash:
+            return hashlib.sha256(data).hexdigest()
+        if xxhash is not None:
+            return xxhash.xxh3_128_hexdigest(data)
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    async def _get_many_from_cache(self, keys: List[str]) -> List[Optional[Dict]]:
+        """Fetch several cache entries in one MGET round-trip when the client supports it."""
+        mget = getattr(self.cache, 'mget', None)
+        if mget is None:
+            return list(await asyncio.gather(*(self._get_from_cache(key) for key in keys)))
+        raw = await mget(keys)
+        return [json.loads(value) if value else None for value in raw]
 
     async def _extract_entities_safe(self, chunks: List[str], **kwargs) -> List[EntityRecord]:
         """Safe entity extraction."""
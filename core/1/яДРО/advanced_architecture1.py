@@ -1,9 +1,15 @@
 # core/advanced_architecture.py
 import asyncio
+import hashlib
+import os
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, List, Dict
+from typing import AsyncGenerator, List, Dict, Optional, Tuple
 
+import numpy as np
 import uvicorn
 from fastapi import FastAPI
 from pydantic import Field, validator
@@ -42,34 +48,74 @@ class AdvancedProcessingConfig(ProcessingConfig):
         return v
 
 
+# Чанкер и event loop в каждом процессе пула: модели TextChunker не сериализуются,
+# поэтому воркер создаёт свой экземпляр один раз при старте
+_worker_chunker = None
+_worker_loop = None
+_chunk_pool = None
+
+
+def _init_chunk_worker() -> None:
+    global _worker_chunker, _worker_loop
+    _worker_chunker = TextChunker()
+    _worker_loop = asyncio.new_event_loop()
+
+
+def _chunk_sync(text: str, chunk_size: int, language: str) -> List[str]:
+    return _worker_loop.run_until_complete(_worker_chunker.chunk(text, chunk_size, language))
+
+
+def _get_chunk_pool() -> ProcessPoolExecutor:
+    """Общий на все экземпляры пул; очередь исполнителя сама ограничивает параллелизм"""
+    global _chunk_pool
+    if _chunk_pool is None:
+        _chunk_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_chunk_worker)
+    return _chunk_pool
+
+
 class AdvancedTextChunker(TextChunker):
     def __init__(self):
         super().__init__()
-        self.semaphore = asyncio.Semaphore(10)
+        self.pool = _get_chunk_pool()
 
     async def chunk(self, text: str, chunk_size: int, language: str) -> List[str]:
-        async with self.semaphore:
-            # семантическая сегментация (можно расширить)
-            return await super().chunk(text, chunk_size, language)
+        # семантическая сегментация (можно расширить); CPU-работа уходит из event loop в процессы
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, _chunk_sync, text, chunk_size, language)
 
 
 class BatchEmbedder(Embedder):
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", dim: Optional[int] = None):
         super().__init__(model_name)
         self.batch_size = 32
+        # Размерность эмбеддинга; если не задана — берётся из первого батча
+        self.dim = dim
 
-    async def generate_batch(self, texts: List[str]) -> List[List[float]]:
-        results: List[List[float]] = []
+    async def generate_batch(self, texts: List[str]) -> np.ndarray:
+        # Один непрерывный float32-буфер на весь вызов: батчи копируются в свои срезы,
+        # результат без копий уходит в FAISS/torch (.tolist() — только на границе HTTP)
+        out = np.empty((len(texts), self.dim), dtype=np.float32) if self.dim is not None else None
         for i in range(0, len(texts), self.batch_size):
-            batch = texts[i : i + self.batch_size]
-            results.extend(await self.generate(batch))
-        return results
+            block = np.asarray(await self.generate(texts[i : i + self.batch_size]), dtype=np.float32)
+            if out is None:
+                self.dim = block.shape[1]
+                out = np.empty((len(texts), self.dim), dtype=np.float32)
+            np.copyto(out[i : i + len(block)], block)
+        if out is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return out
 
 
 class AdvancedDocumentProcessor(DocumentProcessor):
+    RESULT_CACHE_MAX_SIZE = 1024
+    RESULT_CACHE_TTL = 3600.0  # секунды
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.cache: Dict[str, ProcessingResult] = {}
+        # LRU + TTL по хэшу содержимого: одинаковый текст не прогоняется через модель повторно
+        self._result_cache: "OrderedDict[Tuple[str, str, bool], Tuple[float, ProcessingResult]]" = OrderedDict()
+        self._result_cache_lock = asyncio.Lock()
 
     @asynccontextmanager
     async def processing_session(self, config: AdvancedProcessingConfig) -> AsyncGenerator[str, None]:
@@ -83,14 +129,43 @@ class AdvancedDocumentProcessor(DocumentProcessor):
         # удаляем закешированные результаты сессии
         self.cache.pop(session_id, None)
 
+    @staticmethod
+    def _result_key(content: str, config: AdvancedProcessingConfig) -> Tuple[str, str, bool]:
+        digest = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        return digest, config.optimize_for, config.enable_analysis
+
+    async def _get_cached_result(self, key: Tuple[str, str, bool]):
+        async with self._result_cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if time.monotonic() - stored_at > self.RESULT_CACHE_TTL:
+                del self._result_cache[key]
+                return None
+            self._result_cache.move_to_end(key)
+            return result
+
+    async def _store_result(self, key: Tuple[str, str, bool], result: ProcessingResult) -> None:
+        async with self._result_cache_lock:
+            self._result_cache[key] = (time.monotonic(), result)
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self.RESULT_CACHE_MAX_SIZE:
+                self._result_cache.popitem(last=False)
+
     async def advanced_process(self, content: str, config: AdvancedProcessingConfig) -> ProcessingResult:
+        key = self._result_key(content, config)
+        cached = await self._get_cached_result(key)
+        if cached is not None:
+            return cached
         async with self.processing_session(config) as session_id:
             if config.enable_analysis:
                 result = await self._analyze_content(content, config, session_id)
             else:
                 result = await super().process(content, config)
             self.cache[session_id] = result
-            return result
+        await self._store_result(key, result)
+        return result
 
 
 class AdvancedTelegramAdapter(TelegramAdapter):
@@ -155,7 +230,7 @@ class ContentAnalyzer:
 
     async def analyze_sentiment(self, text: str) -> Dict:
         embedding = await self.embedder.generate([text])
-        score = sum(embedding[0])
+        score = float(np.asarray(embedding[0], dtype=np.float32).sum())
         return {"sentiment": "positive" if score > 0 else "negative"}
 
 
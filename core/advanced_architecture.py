@@ -1,5 +1,7 @@
 # core/advanced_architecture.py
 
+import asyncio
+import inspect
 import logging
 import sqlite3
 import json
@@ -7,14 +9,15 @@ import json
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from threading import Thread
+from contextlib import asynccontextmanager
 import importlib
 
 from dependency_injector import containers, providers
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- Конфигурация ---
-from config.secrets import Settings
+from config.secrets import get_settings
 
 # --- Безопасность / Auth ---
 from core.core_auth.jwt_handler import create_token, verify_token
@@ -37,6 +40,7 @@ from core.rag.librarian import LibrarianAI
 
 # --- Сервисы ---
 from core.services.embedding import EmbeddingService
+from core.tools.embedder import CachedEmbeddingService, HTTPEmbeddingClient
 from core.services.search import SemanticSearch
 from core.services.summary import SummaryService
 from core.services.ner import NERService
@@ -60,6 +64,64 @@ except ImportError:
 logger = logging.getLogger("librarian_core")
 logging.basicConfig(level=logging.INFO)
 
+# Настройки читаются один раз при импорте: провайдеры получают готовые значения,
+# а не цепочки Provided, которые вычисляются при каждом обращении.
+# Все поля с умолчаниями описаны и валидируются в Settings
+_settings = get_settings()
+_PATHS = _settings.paths
+_WEB = _settings.web
+_ERP = _settings.erp
+_EMBEDDINGS = _settings.embeddings
+# Общий сервис эмбеддингов вместо модели в каждом воркере uvicorn, если задан remote_url
+_EMBEDDINGS_MODE = "remote" if _EMBEDDINGS.get("remote_url") else "local"
+
+# Синглтоны, которые собираются при старте приложения и кладутся в app.state.
+# Независимые (без общих зависимостей) грузятся параллельно — в основном это загрузка моделей;
+# остальные строятся по порядку поверх уже созданных
+_PARALLEL_SINGLETONS = (
+    "database",
+    "embedding_service",
+    "summary_service",
+    "ner_service",
+    "task_manager",
+    "keyword_search",
+)
+_DEPENDENT_SINGLETONS = (
+    "search_service",
+    "knowledge_graph",
+    "retriever",
+    "librarian",
+)
+# Адаптеры запускаются в lifespan приложения и останавливаются вместе с ним
+_ADAPTERS = ("telegram_bot", "web_interface", "erp_integration")
+
+# Роутеры API: (модуль, префикс, теги). auth и email открыты, остальные требуют авторизации
+_ROUTER_SPECS = (
+    ("auth", "/auth", ["auth"]),
+    ("search", "/search", ["search"]),
+    ("summary", "/summaries", ["summarization"]),
+    ("files", "/files", ["files"]),
+    ("processing", "/process", ["processing"]),
+    ("status", "/status", ["monitoring"]),
+    ("email", "/email", ["email"]),
+)
+_PUBLIC_ROUTERS = frozenset({"auth", "email"})
+
+
+def _load_routers() -> List[tuple]:
+    """Импортирует модули роутеров один раз; отсутствующие пропускаются с предупреждением"""
+    loaded = []
+    for module, prefix, tags in _ROUTER_SPECS:
+        try:
+            loaded.append((importlib.import_module(f"api.{module}").router, prefix, tags, module))
+        except ImportError as e:
+            logger.warning(f"Router {module} not loaded: {str(e)}")
+    return loaded
+
+
+# Импорт при загрузке модуля: create_app (в т.ч. при reload и в каждом воркере) получает готовый список
+_ROUTERS = _load_routers()
+
 
 @dataclass
 class KeywordSearchResult:
@@ -76,29 +138,17 @@ class CoreContainer(containers.DeclarativeContainer):
     """
 
     # --- Конфигурация ---
-    config = providers.Singleton(Settings)
+    config = providers.Object(_settings)
 
     # --- База данных ---
     database = providers.Singleton(
         Database,
-        dsn=(
-            config.provided.DB_TYPE
-            + "://"
-            + config.provided.DB_USER
-            + ":"
-            + config.provided.DB_PASSWORD
-            + "@"
-            + config.provided.DB_HOST
-            + ":"
-            + str(config.provided.DB_PORT)
-            + "/"
-            + config.provided.DB_NAME
-        ),
-        pool_size=config.provided.DB_POOL_SIZE,
-        max_overflow=config.provided.DB_MAX_OVERFLOW,
-        timeout=config.provided.DB_TIMEOUT,
+        dsn=_settings.DATABASE_DSN,
+        pool_size=_settings.DB_POOL_SIZE,
+        max_overflow=_settings.DB_MAX_OVERFLOW,
+        timeout=_settings.DB_TIMEOUT,
         pool_recycle=3600,
-        echo=(config.provided.DEBUG if hasattr(config.provided, "DEBUG") else False),
+        echo=_settings.DB_ECHO,
     )
 
     # --- Безопасность / Auth ---
@@ -108,36 +158,50 @@ class CoreContainer(containers.DeclarativeContainer):
     # --- Парсеры / Предобработка ---
     file_loader = providers.Factory(
         FileLoader,
-        max_file_size=config.provided.MAX_FILE_SIZE,
+        max_file_size=_settings.MAX_FILE_SIZE,
     )
     chunker = providers.Factory(
         SmartChunker,
-        chunk_size=config.provided.CHUNK_SIZE if hasattr(config.provided, "CHUNK_SIZE") else 1000,
-        overlap=config.provided.CHUNK_OVERLAP if hasattr(config.provided, "CHUNK_OVERLAP") else 100,
+        chunk_size=_settings.CHUNK_SIZE,
+        overlap=_settings.CHUNK_OVERLAP,
     )
     text_parser = providers.Factory(
         MultilingualParser,
-        languages=config.provided.ALLOWED_EXTENSIONS if hasattr(config.provided, "ALLOWED_EXTENSIONS") else ["ru", "en"],
+        languages=_settings.ALLOWED_EXTENSIONS,
     )
 
     # --- Сервисы ---
-    embedding_service = providers.Singleton(
-        EmbeddingService,
-        model_name=config.provided.LLM_PROVIDER,
-        device="cpu",
+    embedding_service = providers.Selector(
+        providers.Object(_EMBEDDINGS_MODE),
+        # Локальная модель за двухуровневым кэшем (память + диск, если задан disk_cache_path)
+        local=providers.Singleton(
+            CachedEmbeddingService,
+            inner=providers.Singleton(
+                EmbeddingService,
+                model_name=_settings.EMBEDDING_MODEL,
+                device="cpu",
+            ),
+            l2_path=_EMBEDDINGS.get("disk_cache_path"),
+            l2_size_gb=_EMBEDDINGS.get("disk_cache_gb", 1.0),
+        ),
+        remote=providers.Singleton(
+            HTTPEmbeddingClient,
+            url=_EMBEDDINGS.get("remote_url", ""),
+            model_name=_EMBEDDINGS.get("model"),
+        ),
     )
     search_service = providers.Singleton(
         SemanticSearch,
         embedder=embedding_service,
-        index_config=config.provided.paths["vector_store"] if hasattr(config.provided, "paths") else "knowledge/vector_store/",
+        index_config=_PATHS.get("vector_store", "knowledge/vector_store/"),
     )
     summary_service = providers.Singleton(
         SummaryService,
-        model_name=config.provided.MISTRAL_MODEL_PATH if hasattr(config.provided, "MISTRAL_MODEL_PATH") else None,
+        model_name=_settings.MISTRAL_MODEL_PATH,
     )
     ner_service = providers.Singleton(
         NERService,
-        models=config.provided.ner_models if hasattr(config.provided, "ner_models") else ["spacy-en", "natasha-ru"],
+        models=_settings.ner_models,
     )
     knowledge_graph = providers.Singleton(
         KnowledgeGraph,
@@ -145,16 +209,16 @@ class CoreContainer(containers.DeclarativeContainer):
     )
     task_manager = providers.Singleton(
         TaskManager,
-        broker_url=config.provided.CELERY_BROKER_URL,
-        result_backend=config.provided.CELERY_RESULT_BACKEND,
+        broker_url=_settings.CELERY_BROKER_URL,
+        result_backend=_settings.CELERY_RESULT_BACKEND,
     )
 
     # --- Полнотекстовый поиск (KeywordSearch) ---
     keyword_search = providers.Singleton(
         KeywordSearch,
         index_path=(
-            config.provided.paths["vector_store"] + "keyword_index.db"
-            if hasattr(config.provided, "paths")
+            _PATHS["vector_store"] + "keyword_index.db"
+            if "vector_store" in _PATHS
             else "knowledge/keyword_index.db"
         ),
         enable_highlighting=True,
@@ -184,7 +248,7 @@ class CoreContainer(containers.DeclarativeContainer):
     telegram_bot = (
         providers.Singleton(
             TelegramBot,
-            token=config.provided.paths["logs"] if hasattr(config.provided, "paths") else "",
+            token=_PATHS.get("logs", ""),
             service=librarian,
         )
         if TelegramBot
@@ -193,12 +257,8 @@ class CoreContainer(containers.DeclarativeContainer):
     web_interface = (
         providers.Singleton(
             WebInterface,
-            host=config.provided.web["host"]
-            if hasattr(config.provided, "web") and "host" in config.provided.web
-            else "0.0.0.0",
-            port=config.provided.web["port"]
-            if hasattr(config.provided, "web") and "port" in config.provided.web
-            else 8001,
+            host=_WEB.get("host", "0.0.0.0"),
+            port=_WEB.get("port", 8001),
             service=librarian,
         )
         if WebInterface
@@ -207,9 +267,7 @@ class CoreContainer(containers.DeclarativeContainer):
     erp_integration = (
         providers.Singleton(
             ERPIntegration,
-            connection=config.provided.erp["connection_string"]
-            if hasattr(config.provided, "erp") and "connection_string" in config.provided.erp
-            else "",
+            connection=_ERP.get("connection_string", ""),
             service=librarian,
         )
         if ERPIntegration
@@ -217,76 +275,155 @@ class CoreContainer(containers.DeclarativeContainer):
     )
 
 
+async def _build_singleton(app: FastAPI, container: CoreContainer, name: str) -> None:
+    try:
+        setattr(app.state, name, await asyncio.to_thread(getattr(container, name)))
+    except Exception as e:
+        logger.error(f"Singleton {name} failed to initialize: {str(e)}")
+
+
+async def _build_singletons(app: FastAPI, container: CoreContainer) -> None:
+    """Создаёт синглтоны до приёма трафика: обработчики получают готовые объекты из app.state"""
+    await asyncio.gather(*(_build_singleton(app, container, name) for name in _PARALLEL_SINGLETONS))
+    for name in _DEPENDENT_SINGLETONS:
+        await _build_singleton(app, container, name)
+
+
+async def _await_adapter(name: str, run) -> None:
+    try:
+        await run
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Adapter {name} failed: {str(e)}")
+
+
+def _run_blocking_adapter(name: str, adapter) -> None:
+    try:
+        adapter.start()
+    except Exception as e:
+        logger.error(f"Adapter {name} failed: {str(e)}")
+
+
+async def _start_adapter(container: CoreContainer, name: str):
+    """
+    Создаёт и запускает адаптер. Асинхронный start() работает задачей в loop приложения;
+    блокирующий — в daemon-потоке, чтобы не держать остановку интерпретатора.
+    Возвращает (адаптер, задача или None); (None, None), если адаптер не создан.
+    """
+    try:
+        adapter = await asyncio.to_thread(getattr(container, name))
+    except Exception as e:
+        logger.error(f"Adapter {name} failed: {str(e)}")
+        return None, None
+    task = None
+    if inspect.iscoroutinefunction(adapter.start):
+        task = asyncio.create_task(_await_adapter(name, adapter.start()))
+    else:
+        Thread(target=_run_blocking_adapter, args=(name, adapter), name=f"adapter-{name}", daemon=True).start()
+    logger.info(f"Started adapter: {name}")
+    return adapter, task
+
+
+async def _stop_adapters(adapters: List[tuple]) -> None:
+    """Просит адаптеры остановиться (stop(), если есть), затем отменяет их задачи"""
+    for adapter, _ in adapters:
+        stop = getattr(adapter, "stop", None)
+        if stop is None:
+            continue
+        try:
+            result = stop()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Adapter {type(adapter).__name__} failed to stop: {str(e)}")
+    tasks = [task for _, task in adapters if task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# --- Зависимости для роутеров: готовые экземпляры из app.state ---
+def get_embedder(request: Request) -> EmbeddingService:
+    return request.app.state.embedding_service
+
+
+def get_summary_service(request: Request) -> SummaryService:
+    return request.app.state.summary_service
+
+
+def get_ner_service(request: Request) -> NERService:
+    return request.app.state.ner_service
+
+
+def get_librarian(request: Request) -> LibrarianAI:
+    return request.app.state.librarian
+
+
 def create_app() -> FastAPI:
     """
     Фабрика FastAPI-приложения:
       1. Инициализирует DI-контейнер (CoreContainer) и настраивает логирование.
       2. Регистрирует middleware (CORS), роутеры и зависимости по auth.
-      3. Запускает адаптеры (Telegram, Web, ERP) в отдельном потоке.
+      3. В lifespan создаёт синглтоны (модели грузятся параллельно) и конкурентно запускает
+         адаптеры (Telegram, Web, ERP): асинхронные — задачами asyncio, блокирующие — в daemon-потоках;
+         при остановке у адаптеров вызывается stop(), задачи отменяются.
       4. Возвращает готовое приложение.
     """
     container = CoreContainer()
     config = container.config()
 
-    logging.getLogger().setLevel(config.provided.LOG_LEVEL if hasattr(config.provided, "LOG_LEVEL") else "INFO")
+    logging.getLogger().setLevel(config.LOG_LEVEL)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        container.init_resources()
+        await _build_singletons(app, container)
+        started = await asyncio.gather(*(
+            _start_adapter(container, name)
+            for name in _ADAPTERS
+            if getattr(container, name, None) is not None
+        ))
+        adapters = [(adapter, task) for adapter, task in started if adapter is not None]
+        try:
+            yield
+        finally:
+            await _stop_adapters(adapters)
+            aclose = getattr(getattr(app.state, "embedding_service", None), "aclose", None)
+            if aclose is not None:
+                await aclose()
+            container.shutdown_resources()
 
     app = FastAPI(
-        title=config.provided.name if hasattr(config.provided, "name") else "Librarian AI",
-        version=config.provided.VERSION if hasattr(config.provided, "VERSION") else "1.0.0",
-        docs_url="/docs" if getattr(config.provided, "enable_docs", True) else None,
+        title=config.name,
+        version=config.VERSION,
+        docs_url="/docs" if config.enable_docs else None,
+        lifespan=lifespan,
     )
     app.container = container
+    app.state.jwt = container.jwt_functions()
 
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=getattr(config.provided, "cors_origins", ["*"]),
+        allow_origins=config.cors_origins,
         allow_methods=["*"],
         allow_headers=["*"],
     )
 
-    routers = [
-        ("auth", "/auth", ["auth"]),
-        ("search", "/search", ["search"]),
-        ("summary", "/summaries", ["summarization"]),
-        ("files", "/files", ["files"]),
-        ("processing", "/process", ["processing"]),
-        ("status", "/status", ["monitoring"]),
-        ("email", "/email", ["email"]),
-    ]
-
-    for module, prefix, tags in routers:
-        try:
-            router = importlib.import_module(f"api.{module}").router
-            if module in ("auth", "email"):
-                app.include_router(router, prefix=prefix, tags=tags)
-            else:
-                app.include_router(
-                    router,
-                    prefix=prefix,
-                    dependencies=[Depends(get_current_user)],
-                    tags=tags,
-                )
-        except ImportError as e:
-            container.logger().warning(f"Router {module} not loaded: {str(e)}")
-
-    def start_adapters():
-        adapters = [
-            container.telegram_bot,
-            container.web_interface,
-            container.erp_integration,
-        ]
-        for adapter in filter(None, adapters):
-            try:
-                adapter().start()
-                container.logger().info(f"Started adapter: {adapter}")
-            except Exception as e:
-                container.logger().error(f"Adapter failed: {str(e)}")
-
-    Thread(target=start_adapters, daemon=True).start()
+    for router, prefix, tags, module in _ROUTERS:
+        if module in _PUBLIC_ROUTERS:
+            app.include_router(router, prefix=prefix, tags=tags)
+        else:
+            app.include_router(
+                router,
+                prefix=prefix,
+                dependencies=[Depends(get_current_user)],
+                tags=tags,
+            )
 
     @app.get("/health", tags=["health"])
     async def health_check():
-        return {"status": "OK", "version": config.provided.VERSION}
+        return {"status": "OK", "version": config.VERSION}
 
     return app
 
@@ -299,6 +436,6 @@ if __name__ == "__main__":
         "core.advanced_architecture:create_app",
         host="0.0.0.0",
         port=8000,
-        reload=getattr(app.container.config().provided, "debug", True),
+        reload=app.container.config().DEBUG,
         log_level="info",
     )
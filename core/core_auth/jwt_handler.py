@@ -1,5 +1,5 @@
 # core/core_auth/jwt_handler.py
-import jwt
+from jose import JWTError, jwt
 
 SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
@@ -10,5 +10,5 @@ def create_token(data: dict) -> str:
 def verify_token(token: str) -> dict:
     try:
         return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except jwt.PyJWTError:
+    except JWTError:
         return {}
\ No newline at end of file
@@ -1,11 +1,20 @@
 import sqlite3
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Any, Optional
 from dataclasses import dataclass
 
+from sqlalchemy.pool import QueuePool
+
 logger = logging.getLogger(__name__)
 
+# Пул читателей: 8 постоянных соединений + до 8 временных под всплеск, не больше 16 всего
+READ_POOL_SIZE = 8
+READ_POOL_MAX_OVERFLOW = 8
+READ_POOL_TIMEOUT = 30
+
 @dataclass
 class KeywordSearchResult:
     doc_id: str
@@ -30,12 +39,41 @@ class KeywordSearch:
         """
         self.index_path = index_path
         self.enable_highlighting = enable_highlighting
+        # Единственный писатель: SQLite всё равно сериализует запись, лок избавляет от SQLITE_BUSY
         self.conn = self._init_connection()
-        
+        self._write_lock = threading.Lock()
+        # Читатели берут соединения из пула, а не открывают БД (и файлы WAL/SHM) на каждый запрос
+        self._read_pool = QueuePool(
+            self._connect_reader,
+            pool_size=READ_POOL_SIZE,
+            max_overflow=READ_POOL_MAX_OVERFLOW,
+            timeout=READ_POOL_TIMEOUT,
+        )
+
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        """Открывает соединение; синглтон используется из разных потоков, поэтому check_same_thread=False"""
+        conn = sqlite3.connect(self.index_path, check_same_thread=False, **kwargs)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")
+        return conn
+
+    def _connect_reader(self) -> sqlite3.Connection:
+        # Только чтение — транзакции не нужны, autocommit
+        return self._connect(isolation_level=None)
+
+    @contextmanager
+    def _read_connection(self) -> Iterator[sqlite3.Connection]:
+        """Соединение для чтения из пула; по выходе возвращается в пул"""
+        conn = self._read_pool.connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
     def _init_connection(self) -> sqlite3.Connection:
         """Инициализирует соединение с SQLite и настраивает FTS"""
-        conn = sqlite3.connect(self.index_path)
-        conn.execute("PRAGMA journal_mode=WAL")
+        conn = self._connect()
         
         # Проверяем наличие FTS5
         cursor = conn.cursor()
@@ -65,15 +103,16 @@ class KeywordSearch:
         :param metadata: дополнительные метаданные в формате JSON
         """
         metadata_json = json.dumps(metadata or {})
-        self.conn.execute(
-            "INSERT INTO fts_docs (doc_id, content, metadata) VALUES (?, ?, ?)",
-            (doc_id, content, metadata_json)
-        )
-        self.conn.commit()
+        with self._write_lock:
+            self.conn.execute(
+                "INSERT INTO fts_docs (doc_id, content, metadata) VALUES (?, ?, ?)",
+                (doc_id, content, metadata_json)
+            )
+            self.conn.commit()
     
     def batch_index(self, documents: List[Dict[str, Any]]) -> None:
         """Пакетная индексация документов"""
-        with self.conn:
+        with self._write_lock, self.conn:
             self.conn.executemany(
                 "INSERT INTO fts_docs (doc_id, content, metadata) VALUES (?, ?, ?)",
                 [(doc['id'], doc['content'], json.dumps(doc.get('metadata', {}))) for doc in documents]
@@ -129,11 +168,11 @@ class KeywordSearch:
         sql = base_query.format(highlight=highlight, filter_clause=filter_clause)
         
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, params + [limit])
+            with self._read_connection() as conn:
+                rows = conn.execute(sql, params + [limit]).fetchall()
             results = []
             
-            for row in cursor.fetchall():
+            for row in rows:
                 if row[2] < min_score:  # Пропускаем низкорелевантные
                     continue
                 
@@ -152,16 +191,19 @@ class KeywordSearch:
     
     def delete_document(self, doc_id: str) -> None:
         """Удаляет документ из индекса"""
-        self.conn.execute("DELETE FROM fts_docs WHERE doc_id = ?", (doc_id,))
-        self.conn.commit()
+        with self._write_lock:
+            self.conn.execute("DELETE FROM fts_docs WHERE doc_id = ?", (doc_id,))
+            self.conn.commit()
     
     def optimize_index(self) -> None:
         """Оптимизирует индекс для повышения производительности"""
-        self.conn.execute("INSERT INTO fts_docs(fts_docs) VALUES('optimize')")
-        self.conn.commit()
+        with self._write_lock:
+            self.conn.execute("INSERT INTO fts_docs(fts_docs) VALUES('optimize')")
+            self.conn.commit()
     
     def close(self) -> None:
-        """Закрывает соединение с базой данных"""
+        """Закрывает соединения с базой данных"""
+        self._read_pool.dispose()
         if self.conn:
             self.conn.close()
     
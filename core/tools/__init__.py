@@ -8,8 +8,7 @@
 # ——— Celery-таски ———
 # Предполагается, что в core/tools/async_tasks.py есть:
 #   celery_app  – экземпляр Celery
-#   create_status_task – хотя бы "заглушка" (см. комментарий ниже)
-from .async_tasks import celery_app, create_status_task
+from .async_tasks import celery_app
 
 # ——— Класс для генерации эмбеддингов ———
 # В вашем core/tools/embedder.py класс называется EmbeddingService.
@@ -42,7 +41,7 @@ from .archive_extractors import extract_from_archive, ArchiveExtractor
 
 __all__ = [
     # async-таски
-    "celery_app", "create_status_task",
+    "celery_app",
     # эмбеддер
     "EmbeddingService",
     # извлечение сущностей
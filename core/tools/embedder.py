@@ -1,9 +1,24 @@
 # core/tools/embedder.py
 
-from typing import List, Optional, Union
+from typing import List, Optional, Set, Tuple, Union
+from collections import OrderedDict
+from contextlib import suppress
+import asyncio
+import hashlib
 import logging
+import threading
 import numpy as np
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
 try:
     from sentence_transformers import SentenceTransformer
 except ImportError:
@@ -15,6 +30,9 @@ except ImportError:
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+EMBEDDING_CACHE_SIZE = 8192
+EMBEDDING_CACHE_MAX_TEXT_LEN = 4096  # longer texts are rarely repeated and would bloat the cache
+
 
 class EmbeddingService:
     """
@@ -152,3 +170,366 @@ class EmbeddingService:
             f"device={self.device!r}, "
             f"embedding_dim={self.embedding_dim})>"
         )
+
+
+class CachedEmbeddingService:
+    """
+    Two-tier output cache in front of an EmbeddingService.
+
+    Entries are keyed by (model_name, blake2b(text)). The first tier is an
+    in-memory LRU of float32 vectors. The optional second tier is a diskcache
+    store of raw float32 bytes that survives restarts; it is enabled when
+    `l2_path` is set and diskcache is installed. Texts longer than
+    EMBEDDING_CACHE_MAX_TEXT_LEN, and calls that override `normalize`,
+    bypass the cache.
+
+    Example usage:
+        service = CachedEmbeddingService(EmbeddingService(), l2_path="knowledge/embedding_cache")
+        vec = service.embed_text("Example text")
+    """
+
+    def __init__(
+        self,
+        inner: EmbeddingService,
+        l1_size: int = EMBEDDING_CACHE_SIZE,
+        l2_path: Optional[str] = None,
+        l2_size_gb: float = 1.0
+    ):
+        """
+        Args:
+            inner: Service that computes embeddings on a cache miss.
+            l1_size: Maximum number of vectors kept in memory.
+            l2_path: Directory of the on-disk cache; None disables it.
+            l2_size_gb: Size limit of the on-disk cache in gigabytes.
+        """
+        self.inner = inner
+        self.l1_size = l1_size
+        self._l1: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._l2 = None
+        if l2_path:
+            if diskcache is None:
+                logger.warning("diskcache not installed, on-disk embedding cache disabled")
+            else:
+                self._l2 = diskcache.Cache(l2_path, size_limit=int(l2_size_gb * (1 << 30)))
+
+    def __getattr__(self, name):
+        # model_name, device, embedding_dim, ... come from the wrapped service
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def _key(self, text: str) -> Tuple[str, bytes]:
+        return self.inner.model_name, hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def _get(self, key: Tuple[str, bytes]) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._l1.get(key)
+            if vec is not None:
+                self._l1.move_to_end(key)
+                return vec
+        if self._l2 is None:
+            return None
+        raw = self._l2.get(key[0] + ":" + key[1].hex())
+        if raw is None:
+            return None
+        vec = np.frombuffer(raw, dtype=np.float32)
+        self._put_l1(key, vec)
+        return vec
+
+    def _put_l1(self, key: Tuple[str, bytes], vec: np.ndarray) -> None:
+        with self._lock:
+            self._l1[key] = vec
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_size:
+                self._l1.popitem(last=False)
+
+    def _put(self, key: Tuple[str, bytes], vec: np.ndarray) -> np.ndarray:
+        # Read-only so callers cannot corrupt cached vectors
+        vec = np.array(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        self._put_l1(key, vec)
+        if self._l2 is not None:
+            self._l2.set(key[0] + ":" + key[1].hex(), vec.tobytes())
+        return vec
+
+    def embed_text(
+        self,
+        text: str,
+        normalize: Optional[bool] = None,
+        convert_to_numpy: bool = True
+    ) -> Union[List[float], np.ndarray]:
+        """Same contract as EmbeddingService.embed_text, served from cache when possible."""
+        if normalize is not None or not isinstance(text, str) or len(text) > EMBEDDING_CACHE_MAX_TEXT_LEN:
+            return self.inner.embed_text(text, normalize=normalize, convert_to_numpy=convert_to_numpy)
+        key = self._key(text)
+        vec = self._get(key)
+        if vec is None:
+            vec = self._put(key, self.inner.embed_text(text, convert_to_numpy=False))
+        return vec.tolist() if convert_to_numpy else vec.copy()
+
+    def embed_batch(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        normalize: Optional[bool] = None,
+        convert_to_numpy: bool = True
+    ) -> Union[List[List[float]], np.ndarray]:
+        """Same contract as EmbeddingService.embed_batch; only cache misses reach the model."""
+        if normalize is not None or not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return self.inner.embed_batch(texts, batch_size=batch_size, normalize=normalize,
+                                          convert_to_numpy=convert_to_numpy)
+        out = np.empty((len(texts), self.inner.get_embedding_dimension()), dtype=np.float32)
+        keys: List[Optional[Tuple[str, bytes]]] = []
+        misses: List[int] = []
+        for i, text in enumerate(texts):
+            key = self._key(text) if len(text) <= EMBEDDING_CACHE_MAX_TEXT_LEN else None
+            keys.append(key)
+            vec = self._get(key) if key is not None else None
+            if vec is None:
+                misses.append(i)
+            else:
+                out[i] = vec
+        if misses:
+            computed = self.inner.embed_batch([texts[i] for i in misses], batch_size=batch_size,
+                                              convert_to_numpy=False)
+            for i, vec in zip(misses, computed):
+                out[i] = vec
+                if keys[i] is not None:
+                    self._put(keys[i], vec)
+        return out.tolist() if convert_to_numpy else out
+
+    def clear_cache(self) -> None:
+        """Drop both cache tiers."""
+        with self._lock:
+            self._l1.clear()
+        if self._l2 is not None:
+            self._l2.clear()
+
+    def close(self) -> None:
+        """Close the on-disk cache."""
+        if self._l2 is not None:
+            self._l2.close()
+
+    def __repr__(self):
+        return f"<CachedEmbeddingService(inner={self.inner!r}, l1_size={self.l1_size}, l2={self._l2 is not None})>"
+
+
+class HTTPEmbeddingClient:
+    """
+    Client for a shared embedding inference service, a drop-in replacement
+    for EmbeddingService (same embed_text/embed_batch contract). One model
+    instance serves every API worker instead of each uvicorn worker loading
+    its own copy.
+
+    Async callers are coalesced: texts submitted within `max_wait` seconds of
+    each other are sent in one POST of up to `max_batch_size` texts to
+    `{url}/v1/embeddings` (OpenAI-compatible payload). The sync methods post
+    directly, `batch_size` texts at a time.
+
+    Example usage:
+        client = HTTPEmbeddingClient(url="http://embeddings:8080")
+        vec = client.embed_text("Example text")
+        vec = await client.aembed_text("Example text")
+        await client.aclose()
+    """
+
+    def __init__(
+        self,
+        url: str,
+        model_name: Optional[str] = None,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        timeout: float = 30.0,
+        normalize_embeddings: bool = True
+    ):
+        """
+        Args:
+            url: Base URL of the embedding service.
+            model_name: Model name sent with each request, if the service hosts several.
+            max_batch_size: Maximum number of texts per POST.
+            max_wait: Coalescing window in seconds.
+            timeout: HTTP request timeout in seconds.
+            normalize_embeddings: Default for the sync methods' `normalize` argument.
+        """
+        self.url = url.rstrip("/")
+        self.model_name = model_name
+        self.normalize_embeddings = normalize_embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.embedding_dim: Optional[int] = None
+        self._client = None
+        self._sync_client = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def _ensure_started(self) -> None:
+        # The pool and the batching worker belong to the running event loop,
+        # so they are created on first use rather than in __init__
+        if self._worker is None:
+            if httpx is None:
+                raise ImportError("HTTPEmbeddingClient requires httpx: pip install httpx")
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)
+            )
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._batch_worker())
+
+    async def _batch_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Send without waiting, so the next batch is collected while this one is in flight
+            task = asyncio.create_task(self._flush(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    def _payload(self, texts: List[str]) -> dict:
+        payload = {"input": texts}
+        if self.model_name:
+            payload["model"] = self.model_name
+        return payload
+
+    def _parse_response(self, response, expected: int) -> List[List[float]]:
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        if len(data) != expected:
+            raise ValueError(f"Expected {expected} embeddings, got {len(data)}")
+        if self.embedding_dim is None and data:
+            self.embedding_dim = len(data[0]["embedding"])
+        return [item["embedding"] for item in data]
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            response = await self._client.post(
+                f"{self.url}/v1/embeddings", json=self._payload([text for text, _ in batch])
+            )
+            vectors = self._parse_response(response, len(batch))
+        except Exception as e:
+            logger.error(f"Remote embedding request failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def _post_sync(self, texts: List[str]) -> np.ndarray:
+        if self._sync_client is None:
+            if httpx is None:
+                raise ImportError("HTTPEmbeddingClient requires httpx: pip install httpx")
+            self._sync_client = httpx.Client(timeout=self.timeout)
+        try:
+            response = self._sync_client.post(f"{self.url}/v1/embeddings", json=self._payload(texts))
+            return np.asarray(self._parse_response(response, len(texts)), dtype="float32")
+        except Exception as e:
+            logger.error(f"Remote embedding request failed: {e}")
+            raise
+
+    def _normalize(self, vectors: np.ndarray, normalize: Optional[bool]) -> np.ndarray:
+        if not (self.normalize_embeddings if normalize is None else normalize):
+            return vectors
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def embed_text(
+        self,
+        text: str,
+        normalize: Optional[bool] = None,
+        convert_to_numpy: bool = True
+    ) -> Union[List[float], np.ndarray]:
+        """Same contract as EmbeddingService.embed_text; one blocking POST."""
+        if not isinstance(text, str):
+            raise ValueError("Input text must be a string.")
+        if not text.strip():
+            raise ValueError("Input text cannot be empty.")
+        vec = self._normalize(self._post_sync([text])[0], normalize)
+        return vec.tolist() if convert_to_numpy else vec
+
+    def embed_batch(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        normalize: Optional[bool] = None,
+        convert_to_numpy: bool = True
+    ) -> Union[List[List[float]], np.ndarray]:
+        """Same contract as EmbeddingService.embed_batch; blocking POSTs of `batch_size` texts."""
+        if not isinstance(texts, list):
+            raise ValueError("Input must be a list of texts.")
+        if not all(isinstance(t, str) for t in texts):
+            raise ValueError("All items in texts must be strings.")
+        if texts:
+            embeddings = np.concatenate([
+                self._post_sync(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+            ])
+        else:
+            embeddings = np.empty((0, self.embedding_dim or 0), dtype="float32")
+        embeddings = self._normalize(embeddings, normalize)
+        return embeddings.tolist() if convert_to_numpy else embeddings
+
+    def _submit(self, text: str) -> asyncio.Future:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        return future
+
+    async def aembed_text(self, text: str) -> List[float]:
+        """Embed a single text; batched together with concurrent callers."""
+        if not isinstance(text, str):
+            raise ValueError("Input text must be a string.")
+        if not text.strip():
+            raise ValueError("Input text cannot be empty.")
+        return await self._submit(text)
+
+    async def aembed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed a list of texts; returns a 2D float32 array in input order."""
+        if not isinstance(texts, list):
+            raise ValueError("Input must be a list of texts.")
+        if not all(isinstance(t, str) for t in texts):
+            raise ValueError("All items in texts must be strings.")
+        if not texts:
+            return np.empty((0, self.embedding_dim or 0), dtype="float32")
+        vectors = await asyncio.gather(*(self._submit(t) for t in texts))
+        return np.asarray(vectors, dtype="float32")
+
+    def get_embedding_dimension(self) -> int:
+        """Dimension reported by the service; probed with one request if nothing was embedded yet."""
+        if self.embedding_dim is None:
+            self._post_sync(["test"])
+        return self.embedding_dim
+
+    async def aclose(self) -> None:
+        """Stop the batching worker and close the connection pool."""
+        if self._worker is not None:
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection used by the sync methods."""
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    def __repr__(self):
+        return f"<HTTPEmbeddingClient(url={self.url!r}, max_batch_size={self.max_batch_size})>"
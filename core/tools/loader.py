@@ -99,6 +99,32 @@ class FileLoader:
             logger.error(f"Error processing {file_path}: {str(e)}", exc_info=True)
             raise FileProcessingError(f"Failed to process {file_path}") from e
 
+    async def load_bytes(self, data: bytes, name: str, mime_type: str = 'text/plain', chunk_size: int = CHUNK_SIZE_DEFAULT, max_chunks: Optional[int] = None, language: str = "en") -> ProcessingResult:
+        """Обработка небольшого текстового файла целиком в памяти, без записи на диск"""
+        if SUPPORTED_MIME_TYPES.get(mime_type) != 'txt':
+            raise FileProcessingError(f"In-memory processing supports only text/plain: {name}")
+        if len(data) > MAX_FILE_SIZE:
+            raise FileProcessingError(f"Invalid file: {name}")
+
+        start_time = datetime.now().timestamp()
+        metadata = FileMetadata(
+            name=name,
+            size=len(data),
+            modified=start_time,
+            mime_type=mime_type,
+            checksum=hashlib.sha256(data).hexdigest(),
+            language=self._detect_language(name)
+        )
+        try:
+            chunks = self.chunker.chunk(data.decode('utf-8', errors='replace'), chunk_size, language)
+            if max_chunks and len(chunks) > max_chunks:
+                chunks = chunks[:max_chunks]
+                logger.warning(f"Truncated to {max_chunks} chunks for {name}")
+            return ProcessingResult(chunks=chunks, metadata=metadata, processing_time=datetime.now().timestamp() - start_time)
+        except Exception as e:
+            logger.error(f"Error processing {name}: {str(e)}", exc_info=True)
+            raise FileProcessingError(f"Failed to process {name}") from e
+
     async def load_files(self, file_paths: List[Union[str, Path]], chunk_size: int = CHUNK_SIZE_DEFAULT, max_workers: Optional[int] = None, timeout: int = 300) -> List[ProcessingResult]:
         results = []
         max_workers = max_workers or self.max_workers
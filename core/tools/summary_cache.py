@@ -0,0 +1,117 @@
+# 📂 core/tools/summary_cache.py
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = 0.95
+CACHE_TTL = 3600  # секунды
+MAX_ENTRIES_PER_NAMESPACE = 5000
+
+
+class _Namespace:
+    """Плоский индекс одного режима генерации: векторы + ответы в порядке вставки"""
+
+    def __init__(self):
+        self.vectors: List[np.ndarray] = []
+        self.entries: List[Tuple[float, Dict]] = []
+        self.matrix: Optional[np.ndarray] = None
+
+    def search(self, vector: np.ndarray) -> Tuple[float, int]:
+        if self.matrix is None:
+            self.matrix = np.vstack(self.vectors)
+        scores = self.matrix @ vector
+        best = int(np.argmax(scores))
+        return float(scores[best]), best
+
+
+class SummaryCache:
+    """
+    Семантический кэш summary: если похожий текст уже суммаризировался
+    в том же режиме (язык, длина, стиль, роль), возвращает готовый ответ
+    без обращения к LLM. Поиск — полный перебор по косинусной близости,
+    этого достаточно для нескольких тысяч записей.
+    """
+
+    def __init__(
+        self,
+        embed: Optional[Callable[[str], np.ndarray]] = None,
+        threshold: float = SIMILARITY_THRESHOLD,
+        ttl: float = CACHE_TTL,
+        max_entries: int = MAX_ENTRIES_PER_NAMESPACE
+    ):
+        self._embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = True
+        self._namespaces: Dict[Hashable, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def _default_embed(self) -> Optional[Callable[[str], np.ndarray]]:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            logger.warning("sentence-transformers не установлен — семантический кэш summary отключён")
+            self.enabled = False
+            return None
+        try:
+            model = SentenceTransformer(DEFAULT_EMBEDDING_MODEL, device="cpu")
+        except Exception as e:
+            # Нет сети / модели: кэш необязателен, запросы идут напрямую в генератор
+            logger.warning(f"Модель эмбеддингов не загружена — семантический кэш summary отключён: {e}")
+            self.enabled = False
+            return None
+        return lambda text: model.encode(text, normalize_embeddings=True, convert_to_numpy=True)
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Нормированный эмбеддинг текста или None, если кэш недоступен"""
+        if not self.enabled:
+            return None
+        if self._embed is None:
+            with self._lock:
+                # enabled перепроверяем: неудачная загрузка в другом потоке не повторяется
+                if self._embed is None and self.enabled:
+                    self._embed = self._default_embed()
+            if self._embed is None:
+                return None
+        try:
+            vector = np.asarray(self._embed(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Ошибка эмбеддинга — семантический кэш summary отключён: {e}")
+            self.enabled = False
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, namespace: Hashable, vector: np.ndarray) -> Optional[Dict]:
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None or not ns.vectors:
+                return None
+            score, idx = ns.search(vector)
+            if score < self.threshold:
+                return None
+            expires_at, response = ns.entries[idx]
+            if expires_at < time.monotonic():
+                return None
+            return response
+
+    def store(self, namespace: Hashable, vector: np.ndarray, response: Dict) -> None:
+        with self._lock:
+            ns = self._namespaces.setdefault(namespace, _Namespace())
+            now = time.monotonic()
+            # Вычищаем просроченные и самые старые записи сверх лимита
+            keep = [i for i, (expires_at, _) in enumerate(ns.entries) if expires_at >= now]
+            keep = keep[-(self.max_entries - 1):] if self.max_entries > 1 else []
+            if len(keep) != len(ns.entries):
+                ns.vectors = [ns.vectors[i] for i in keep]
+                ns.entries = [ns.entries[i] for i in keep]
+            ns.vectors.append(vector)
+            ns.entries.append((now + self.ttl, response))
+            ns.matrix = None
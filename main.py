@@ -8,6 +8,7 @@ from app.api.routers.summary import router as summary_router
 from app.api.routers.docs import router as docs_router
 from app.core.config import settings
 from app.core.advanced_architecture import AdvancedApplication
+from utils.metrics import metrics_middleware
 
 # Создание экземпляра приложения, включающего FastAPI и Telegram
 app_instance = AdvancedApplication()
@@ -23,6 +24,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Гистограмма длительности запросов — одна middleware на всё приложение
+app.middleware("http")(metrics_middleware)
+
 # Подключаем маршруты
 app.include_router(file_router, prefix="/files", tags=["📁 Files"])
 app.include_router(email_router, prefix="/email", tags=["📨 Email"])
@@ -0,0 +1,63 @@
+# Тестирование сигнатуры намерения для семантического кеша AI-ответов
+# tests/test_analyzer_cache.py
+import pytest
+
+analyzer = pytest.importorskip("agents.project_analyzer.analyzer")
+
+
+def _prompt(changes: dict, root: str = "/tmp/prev_123") -> str:
+    """
+    Prompt в том же формате, что собирает анализатор проекта.
+    """
+    return (
+        f"Project root: {root}\n\n"
+        "Recent changes:\n```\n" + analyzer.build_changes_report(changes) + "\n```\n"
+    )
+
+
+def _changes(added=(), removed=(), modified=()) -> dict:
+    return {
+        "added": list(added),
+        "removed": list(removed),
+        "modified": [{"file": f, "diff": d} for f, d in modified],
+    }
+
+
+def test_same_intent_same_signature():
+    """
+    Порядок файлов, путь к временному корню и лишние пробелы не меняют сигнатуру.
+    """
+    first = _prompt(_changes(added=["b.py", "a.py"], removed=["c.py"]), root="/tmp/prev_1")
+    second = _prompt(_changes(added=["a.py", "b.py"], removed=["c.py"]), root="/tmp/prev_2") + "   \n"
+
+    assert analyzer.AICache.signature(first) == analyzer.AICache.signature(second)
+
+
+@pytest.mark.parametrize("diff_a, diff_b", [
+    # Добавленная и удалённая строки местами — это другое изменение
+    ("-x = 1\n+x = 2", "-x = 2\n+x = 1"),
+    # Отступ значим
+    ("+    return x", "+        return x"),
+    # Регистр строк кода, оканчивающихся на ':', значим
+    ("+def foo():", "+def Foo():"),
+    # Временная метка внутри кода — тоже содержимое
+    ("+STAMP = '2024-01-01 10:00'", "+STAMP = '2025-06-30 23:59'"),
+])
+def test_diff_bodies_are_byte_exact(diff_a, diff_b):
+    """
+    Разные тела diff всегда дают разные сигнатуры, иначе второе изменение получит чужой кешированный ответ.
+    """
+    first = _prompt(_changes(modified=[("m.py", diff_a)]))
+    second = _prompt(_changes(modified=[("m.py", diff_b)]))
+
+    assert analyzer.AICache.signature(first) != analyzer.AICache.signature(second)
+
+
+def test_diff_lines_are_not_sorted():
+    """
+    Строки '+'/'-' внутри diff не принимаются за элементы списка файлов.
+    """
+    diff = "+zeta = 1\n+alpha = 2"
+    canonical = analyzer.canonicalize_prompt(_prompt(_changes(modified=[("m.py", diff)])))
+
+    assert diff in canonical
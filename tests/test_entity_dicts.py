@@ -0,0 +1,61 @@
+# Тестирование словарного поиска сущностей в EntityExtractor
+# tests/test_entity_dicts.py
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("yaml")
+pytest.importorskip("ahocorasick")
+
+EXTRACTOR_PATH = Path(__file__).resolve().parent.parent / "core" / "1" / "entity_extractor_advanced.py"
+
+CUSTOM_DICTS = {
+    "LOC": ["York", "New York", "New York City"],
+    "ORG": ["Acme", "Acme Corp"],
+    "TEAM": ["York"],
+}
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    """
+    EntityExtractor без NLP-моделей: core/1 — не пакет, модуль грузится по пути к файлу.
+    """
+    spec = importlib.util.spec_from_file_location("entity_extractor_advanced", EXTRACTOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EntityExtractor(lang="xx", enable_multiprocessing=False, custom_dicts=CUSTOM_DICTS)
+
+
+def _spans(entities):
+    return [(e.label, e.text) for e in entities]
+
+
+@pytest.mark.parametrize("text", [
+    "I love New York",
+    "New York City never sleeps, York is smaller",
+    "Acme Corp bought Acme; Yorkshire is not York",
+    "new york and NEW YORK CITY",
+])
+def test_automaton_matches_regex(extractor, text):
+    """
+    Автомат Aho-Corasick и regex-alternation дают одинаковые непересекающиеся совпадения.
+    """
+    automaton = extractor._extract_from_dicts(text)
+    ac, extractor._ac = extractor._ac, None
+    try:
+        regex = extractor._extract_from_dicts(text)
+    finally:
+        extractor._ac = ac
+
+    assert _spans(automaton) == _spans(regex)
+
+
+def test_nested_entry_not_reported(extractor):
+    """
+    Вложенное словарное вхождение («York» внутри «New York») не дублируется.
+    """
+    entities = extractor._extract_from_dicts("I love New York")
+
+    assert _spans(entities) == [("LOC", "New York"), ("TEAM", "York")]
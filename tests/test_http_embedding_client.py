@@ -0,0 +1,84 @@
+# Тестирование клиента удалённого сервиса эмбеддингов
+# tests/test_http_embedding_client.py
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+httpx = pytest.importorskip("httpx")
+embedder = pytest.importorskip("core.tools.embedder", exc_type=ImportError)
+
+
+@pytest.fixture
+def requests_log(monkeypatch):
+    """
+    Подменяет HTTP-транспорт клиента на httpx.MockTransport; возвращает список тел запросов.
+    Эмбеддинг текста — вектор [длина текста, 1.0].
+    """
+    log = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        log.append(body)
+        data = [{"index": i, "embedding": [float(len(t)), 1.0]} for i, t in enumerate(body["input"])]
+        # Сервис вправе вернуть элементы не по порядку — клиент сортирует по index
+        return httpx.Response(200, json={"data": data[::-1]})
+
+    transport = httpx.MockTransport(handler)
+    async_client, sync_client = httpx.AsyncClient, httpx.Client
+    monkeypatch.setattr(embedder.httpx, "AsyncClient", lambda **kw: async_client(transport=transport, **kw))
+    monkeypatch.setattr(embedder.httpx, "Client", lambda **kw: sync_client(transport=transport, **kw))
+    return log
+
+
+def test_concurrent_requests_coalesced(requests_log):
+    """
+    Одновременные aembed_text уходят одним POST, и каждый вызывающий получает свой вектор.
+    """
+    async def run():
+        client = embedder.HTTPEmbeddingClient(url="http://embeddings/", max_wait=0.05)
+        try:
+            return await asyncio.gather(*(client.aembed_text("x" * n) for n in (1, 2, 3)))
+        finally:
+            await client.aclose()
+
+    vectors = asyncio.run(run())
+
+    assert requests_log == [{"input": ["x", "xx", "xxx"]}]
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+
+
+def test_max_batch_size_splits_posts(requests_log):
+    """
+    Пакет больше max_batch_size делится на несколько POST, порядок результатов сохраняется.
+    """
+    async def run():
+        client = embedder.HTTPEmbeddingClient(url="http://embeddings", max_batch_size=2, max_wait=0.05)
+        try:
+            return await client.aembed_batch(["a", "bb", "ccc"])
+        finally:
+            await client.aclose()
+
+    vectors = asyncio.run(run())
+
+    assert [len(body["input"]) for body in requests_log] == [2, 1]
+    assert vectors[:, 0].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_sync_interface_matches_embedding_service(requests_log):
+    """
+    Синхронные embed_text/embed_batch повторяют контракт EmbeddingService.
+    """
+    client = embedder.HTTPEmbeddingClient(url="http://embeddings", model_name="mini")
+    try:
+        assert client.embed_text("abc", normalize=False) == [3.0, 1.0]
+        batch = client.embed_batch(["a", "bb", "ccc"], batch_size=2, convert_to_numpy=False)
+        assert client.get_embedding_dimension() == 2
+    finally:
+        client.close()
+
+    assert isinstance(batch, np.ndarray) and batch.shape == (3, 2)
+    assert np.allclose(np.linalg.norm(batch, axis=1), 1.0)
+    assert [body["input"] for body in requests_log] == [["abc"], ["a", "bb"], ["ccc"]]
+    assert all(body["model"] == "mini" for body in requests_log)
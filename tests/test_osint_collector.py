@@ -0,0 +1,118 @@
+# Тестирование пакетной записи статей в OSINTScraper
+# tests/test_osint_collector.py
+import sqlite3
+
+import pytest
+
+collector = pytest.importorskip("agents.osint_plus.collector")
+
+
+def _article(i: int) -> dict:
+    return {
+        "url": f"https://example.com/{i}",
+        "title": f"Title {i}",
+        "content": f"Content {i}",
+        "source": "https://example.com",
+    }
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    """
+    OSINTScraper с БД и выходным каталогом во временной директории.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(collector, "OUTPUT_DIR", str(tmp_path / "out"))
+    return collector.OSINTScraper()
+
+
+def _count_articles(tmp_path) -> int:
+    conn = sqlite3.connect(str(tmp_path / "osint_articles.db"))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_close_flushes_pending(scraper, tmp_path):
+    """
+    Статьи меньше WRITE_BATCH_SIZE остаются в буфере и должны попасть в БД при close().
+    """
+    scraper.save_articles_to_db([_article(i) for i in range(3)])
+    assert len(scraper._pending) == 3
+
+    scraper.close()
+
+    assert _count_articles(tmp_path) == 3
+
+
+def test_driver_reset_keeps_pending(scraper, tmp_path):
+    """
+    Пересоздание Selenium-драйвера после ошибки не должно очищать буфер записи.
+    """
+    scraper.save_articles_to_db([_article(1)])
+
+    scraper._quit_driver()
+
+    assert len(scraper._pending) == 1
+    scraper.close()
+    assert _count_articles(tmp_path) == 1
+
+
+def test_batch_written_at_threshold(scraper, tmp_path):
+    """
+    При достижении WRITE_BATCH_SIZE буфер сбрасывается в БД без вызова close().
+    """
+    scraper.save_articles_to_db([_article(i) for i in range(collector.WRITE_BATCH_SIZE)])
+
+    assert scraper._pending == []
+    assert _count_articles(tmp_path) == collector.WRITE_BATCH_SIZE
+    scraper.close()
+
+
+def test_driver_reset_keeps_metric_counters(scraper):
+    """
+    Несброшенные в Prometheus счётчики переживают пересоздание драйвера и обнуляются только после отправки.
+    """
+    scraped_before = collector.SCRAPED_PAGES._value.get()
+    scraper._local_scraped = 2
+
+    scraper._quit_driver()
+    assert scraper._local_scraped == 2
+
+    scraper.close()
+    assert scraper._local_scraped == 0
+    assert collector.SCRAPED_PAGES._value.get() == scraped_before + 2
+
+
+class _FailingConnection:
+    """
+    Соединение, у которого запись падает, как при заблокированной БД.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def executemany(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_failed_flush_keeps_pending(scraper, tmp_path):
+    """
+    Ошибка записи не теряет буфер: статьи сохраняются при следующем flush().
+    """
+    scraper.save_articles_to_db([_article(i) for i in range(3)])
+    conn, scraper.db_conn = scraper.db_conn, _FailingConnection(scraper.db_conn)
+
+    scraper.flush()
+    assert len(scraper._pending) == 3
+
+    scraper.db_conn = conn
+    scraper.close()
+    assert _count_articles(tmp_path) == 3
@@ -0,0 +1,104 @@
+# Тестирование дедупликации чанков в DocumentProcessor
+# tests/test_processor_dedup.py
+import ast
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+PROCESSOR_PATH = Path(__file__).resolve().parent.parent / "core" / "1" / "processor.py"
+METHODS = ("_collect_embeddings", "_embed_chunks_safe")
+
+
+class _ChunkMetadata:
+    """
+    Минимальная замена ChunkMetadata: только поля, которые пишет процессор.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def dict(self):
+        return dict(self.fields)
+
+
+def _load_methods() -> dict:
+    """
+    core/1 — не пакет, поэтому нужные методы компилируются прямо из исходника.
+    """
+    tree = ast.parse(PROCESSOR_PATH.read_text(encoding="utf-8"))
+    cls = next(
+        node for node in tree.body
+        if isinstance(node, ast.ClassDef) and node.name == "DocumentProcessor"
+    )
+    funcs = [node for node in cls.body if isinstance(node, ast.AsyncFunctionDef) and node.name in METHODS]
+    namespace = {
+        "List": List, "Dict": Dict, "Optional": Optional, "Tuple": Tuple,
+        "AsyncIterator": AsyncIterator, "np": np, "asyncio": asyncio,
+        "datetime": datetime, "logger": logging.getLogger(__name__),
+        "ChunkMetadata": _ChunkMetadata,
+    }
+    module = ast.fix_missing_locations(ast.Module(body=funcs, type_ignores=[]))
+    exec(compile(module, str(PROCESSOR_PATH), "exec"), namespace)
+    return {name: namespace[name] for name in METHODS}
+
+
+class _Histogram:
+    def labels(self, **_):
+        return self
+
+    def observe(self, _):
+        pass
+
+
+class _Embedder:
+    def __init__(self):
+        self.batches = []
+
+    async def aencode_batch(self, texts):
+        self.batches.append(list(texts))
+        return [np.full(2, float(len(text)), dtype=np.float32) for text in texts]
+
+
+class _Health:
+    cache = False
+
+
+class _Processor:
+    _cache_prefix = "emb:"
+
+    def __init__(self):
+        self.embedder = _Embedder()
+        self.health_status = _Health()
+        self.metrics = {"processing_time": _Histogram()}
+        self.persisted = []
+
+    def _hash_chunk(self, chunk):
+        return f"h-{chunk}"
+
+    async def _persist_embedding(self, vector, meta, key):
+        self.persisted.append(meta)
+
+
+for _name, _method in _load_methods().items():
+    setattr(_Processor, _name, _method)
+
+
+def test_repeated_chunk_keeps_original_indices():
+    """
+    Повторяющийся чанк кодируется один раз, но каждая позиция получает свой chunk_index,
+    а сохраняемые метаданные ссылаются на позицию в исходном документе.
+    """
+    processor = _Processor()
+
+    results = asyncio.run(processor._collect_embeddings(["A", "A", "B"], "doc.txt"))
+
+    assert processor.embedder.batches == [["A", "B"]]
+    assert [meta["chunk_index"] for _, meta in results] == [0, 1, 2]
+    assert [meta["text_hash"] for _, meta in results] == ["h-A", "h-A", "h-B"]
+    assert sorted(meta["chunk_index"] for meta in processor.persisted) == [0, 2]
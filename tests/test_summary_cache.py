@@ -0,0 +1,54 @@
+# Тестирование семантического кэша summary
+# tests/test_summary_cache.py
+import sys
+import types
+
+import numpy as np
+import pytest
+
+summary_cache = pytest.importorskip("core.tools.summary_cache", exc_type=ImportError)
+
+
+def test_model_load_failure_disables_cache(monkeypatch):
+    """
+    Ошибка загрузки модели (нет сети / модели) отключает кэш один раз, а не роняет каждый запрос.
+    """
+    attempts = []
+
+    class FailingModel:
+        def __init__(self, *args, **kwargs):
+            attempts.append(1)
+            raise OSError("model not found")
+
+    fake = types.ModuleType("sentence_transformers")
+    fake.SentenceTransformer = FailingModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake)
+
+    cache = summary_cache.SummaryCache()
+    for _ in range(3):
+        assert cache.embed("text") is None
+
+    assert cache.enabled is False
+    assert len(attempts) == 1
+
+
+def test_embed_failure_disables_cache():
+    """
+    Исключение при вычислении эмбеддинга не пробрасывается наружу.
+    """
+    def broken(text):
+        raise RuntimeError("CUDA error")
+
+    cache = summary_cache.SummaryCache(embed=broken)
+
+    assert cache.embed("text") is None
+    assert cache.enabled is False
+
+
+def test_embed_normalizes():
+    """
+    Эмбеддинг возвращается нормированным.
+    """
+    cache = summary_cache.SummaryCache(embed=lambda text: np.array([3.0, 4.0]))
+
+    assert np.allclose(cache.embed("text"), [0.6, 0.8])
@@ -1,9 +1,12 @@
 # utils/metrics.py
+import time
+
 from prometheus_client import Counter, Histogram
 
 REQUEST_COUNT = Counter("librarian_requests_total", "Количество HTTP-запросов", ["endpoint"])
 REQUEST_LATENCY = Histogram("librarian_request_latency_seconds", "Время обработки запроса", ["endpoint"])
 
+
 def track_request(endpoint: str):
     def decorator(func):
         def wrapper(*args, **kwargs):
@@ -11,4 +14,32 @@ def track_request(endpoint: str):
             with REQUEST_LATENCY.labels(endpoint=endpoint).time():
                 return func(*args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+# Границы корзин подобраны под API: от быстрых проверок до тяжёлой обработки документов
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Длительность HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=HTTP_LATENCY_BUCKETS
+)
+
+
+async def metrics_middleware(request, call_next):
+    """HTTP-middleware: одна гистограмма на все эндпоинты, метка — шаблон маршрута, а не URL"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        ).observe(time.perf_counter() - start)